@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+#
+
+import argparse
+import gc
+import json
+import operator
+import os
+import re
+import sys
+import timeit
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from composer import *
+
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'composer_baseline.json')
+
+_0 = composer(0)
+_1 = composer(1)
+
+
+def readme_comp():
+    _add_val = composer('add_val')
+    _sub_val = composer('sub_val')
+    return \
+            composer(operator.add, _0, _add_val) >> \
+            composer(operator.sub, _0, _sub_val)
+
+
+def specialise(func, mode):
+    if mode == 'compiled':
+        return func.compile()
+    elif mode == 'adaptive':
+        return func.adaptive()
+    else:
+        return func
+
+
+def readme(mode=None):
+    func = specialise(readme_comp()(add_val=3, sub_val=10), mode)
+    return lambda: func(20)
+
+
+def readme_apply():
+    func_comp = readme_comp()
+    return lambda: func_comp(add_val=3, sub_val=10)(20)
+
+
+def _collect(*args, **kwargs):
+    return args, kwargs
+
+
+def placeholders():
+    func = composer(_collect, _0, _1, composer(2), 3,
+            a=composer('a'), b=composer('b'), c=4)
+    return lambda: func(1, 2, 3, a=4, b=5)
+
+
+def chain(depth, mode=None):
+    add1 = composer(operator.add, _0, 1)
+    func = add1
+    for _ in range(depth - 1):
+        func = func >> add1
+    func = specialise(func, mode)
+    return lambda: func(0)
+
+
+def fanout(width, mode=None):
+    func = composer(operator.add, _0, _1)
+    for idx in range(width - 1):
+        func = func | composer(operator.add, _0, idx)
+    func = specialise(func, mode)
+    return lambda: func(10, 5)
+
+
+def builtin():
+    func = composer(operator.add)
+    return lambda: func(1, 2)
+
+
+def iterable(stages, size=100):
+    func = composer(range(size))
+    for _ in range(stages):
+        func = func >> composer(operator.add, _0, 1)
+    return lambda: list(func())
+
+
+def batch(size=1000):
+    func = composer(operator.add, _0, 3) >> composer(operator.sub, _0, 10)
+    column = list(range(size))
+    if numpy is not None:
+        column = numpy.arange(size)
+    return lambda: func.map_batch(column)
+
+
+CASES = [
+    ('readme', readme),
+    ('readme-apply', readme_apply),
+    ('readme-compiled', lambda: readme('compiled')),
+    ('readme-adaptive', lambda: readme('adaptive')),
+    ('placeholders', placeholders),
+    ('chain-10', lambda: chain(10)),
+    ('chain-100', lambda: chain(100)),
+    ('chain-1000', lambda: chain(1000)),
+    ('chain-100-compiled', lambda: chain(100, 'compiled')),
+    ('chain-100-adaptive', lambda: chain(100, 'adaptive')),
+    ('fanout-4', lambda: fanout(4)),
+    ('fanout-32', lambda: fanout(32)),
+    ('fanout-32-compiled', lambda: fanout(32, 'compiled')),
+    ('fanout-32-adaptive', lambda: fanout(32, 'adaptive')),
+    ('builtin', builtin),
+    ('iterable-1x100', lambda: iterable(1)),
+    ('iterable-10x100', lambda: iterable(10)),
+    ('map-batch-1000', batch),
+]
+
+
+def _add(a, b):
+    return a + b
+
+
+def reference():
+    # plain python calls; timed along with every case, so that the
+    # ratios do not follow the load of the machine
+    x = 0
+    for idx in range(10):
+        x = _add(_add(x, idx), -1)
+    return x
+
+
+def measure(run, repeat=7, calls=1000):
+    # ns per call next to the reference ns, the peak bytes allocated
+    # during one call and the blocks a call leaves allocated, its result
+    # included
+    timer = timeit.Timer(run)
+    ref_timer = timeit.Timer(reference)
+    number = timer.autorange()[0]
+    ref_number = ref_timer.autorange()[0]
+    ns = ref = float('inf')
+    for _ in range(repeat):
+        ns = min(ns, timer.timeit(number) / number * 1e9)
+        ref = min(ref, ref_timer.timeit(ref_number) / ref_number * 1e9)
+
+    tracemalloc.start()
+    peak = 0
+    for _ in range(min(number, 100)):
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        run()
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+
+    results = [ None ] * calls
+    gc.collect()
+    gc.disable()
+    try:
+        before = sys.getallocatedblocks()
+        for idx in range(calls):
+            results[idx] = run()
+        blocks = sys.getallocatedblocks() - before
+    finally:
+        gc.enable()
+    return { 'ns': ns, 'ref': ref, 'bytes': peak,
+        'blocks': float(blocks) / calls }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='composer benchmarks')
+    parser.add_argument('-k', dest='pattern', default='',
+            help='only the cases matching this regular expression')
+    parser.add_argument('--save', nargs='?', const=BASELINE,
+            help='store the results as the baseline')
+    parser.add_argument('--compare', nargs='?', const=BASELINE,
+            help='compare with a stored baseline')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+            help='allowed slowdown before a case counts as a regression')
+    options = parser.parse_args(argv)
+
+    # baselines are machine specific, so only a locally saved one is
+    # compared with
+    baseline = {}
+    if options.compare:
+        if not os.path.exists(options.compare):
+            parser.error('no baseline at %s, save one with --save first' \
+                    % options.compare)
+        with open(options.compare) as f:
+            baseline = json.load(f)
+
+    print('%-20s %12s %12s %12s %12s %8s' % ('case', 'ns/call',
+        'peak B/call', 'blocks/call', 'baseline ns', 'ratio'))
+    results = {}
+    regressions = []
+    for name, case in CASES:
+        if not re.search(options.pattern, name):
+            continue
+        result = results[name] = measure(case())
+        base = baseline.get(name)
+        if base is None:
+            print('%-20s %12.0f %12d %12.2f' % (name, result['ns'],
+                result['bytes'], result['blocks']))
+            continue
+        ratio = (result['ns'] / result['ref']) / \
+                (base['ns'] / base.get('ref', result['ref']))
+        regressed = ratio > 1 + options.tolerance or \
+                result['bytes'] > base['bytes'] * (1 + options.tolerance) or \
+                result['blocks'] > base.get('blocks', result['blocks']) * \
+                (1 + options.tolerance) + 1
+        if regressed:
+            regressions.append(name)
+        print('%-20s %12.0f %12d %12.2f %12.0f %7.2fx%s' % (name,
+            result['ns'], result['bytes'], result['blocks'], base['ns'],
+            ratio, ' REGRESSION' if regressed else ''))
+
+    if options.save:
+        saved = {}
+        if os.path.exists(options.save):
+            with open(options.save) as f:
+                saved = json.load(f)
+        saved.update(results)
+        with open(options.save, 'w') as f:
+            json.dump(saved, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    if regressions:
+        print('')
+        print('regressions: %s' % ', '.join(regressions))
+        return 1
+    return 0
+
+
+########################################################################
+# main
+########################################################################
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+#
+
+import gc
+import operator
+import os
+import sys
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from composer import *
+
+
+_0 = composer(0)
+_a = composer('a')
+
+NODES = [
+    ('args', lambda: ComposerArgs(0)),
+    ('kwargs', lambda: ComposerKwargs('a')),
+    ('value', lambda: ComposerValue(1)),
+    ('function', lambda: ComposerFunction(operator.add, _0, 1)),
+    ('builtin', lambda: ComposerBuiltin(operator.add)),
+    ('bind', lambda: ComposerBind(_0, _a)),
+    ('or', lambda: ComposerOr(_a, _a)),
+    ('iterable', lambda: ComposerIterable([])),
+    ('iter-bind', lambda: ComposerIterableBind(_0, _a)),
+]
+
+
+def node_size(make, count):
+    # bytes and allocated blocks per node, the nodes are kept alive
+    nodes = [ None ] * count
+    gc.collect()
+    gc.disable()
+    try:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        blocks = sys.getallocatedblocks()
+        for idx in range(count):
+            nodes[idx] = make()
+        blocks = sys.getallocatedblocks() - blocks
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    finally:
+        gc.enable()
+    return float(after - before) / count, float(blocks) / count
+
+
+def main(count=10000):
+    # the allocations per call are reported by composer_bench.py
+    print('%-12s %12s %12s' % ('node', 'bytes/node', 'blocks/node'))
+    for name, make in NODES:
+        print('%-12s %12.1f %12.2f' % ((name, ) + node_size(make, count)))
+
+
+########################################################################
+# main
+########################################################################
+
+if __name__ == '__main__':
+    main(*[ int(arg) for arg in sys.argv[1:] ])
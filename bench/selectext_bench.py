@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+#
+
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from selectext import *
+
+
+def main(count=100000, spread=1.0):
+    selectext = SelectExt()
+    fired = []
+    timeouts = [ random.random() * spread for _ in range(count) ]
+
+    start = time.time()
+    idxs = [ selectext.set_timer(timeout, lambda: fired.append(None)) \
+            for timeout in timeouts ]
+    set_time = time.time() - start
+
+    start = time.time()
+    for idx in idxs[::2]:
+        selectext.unset_timer(idx)
+    unset_time = time.time() - start
+
+    start = time.time()
+    waits = 0
+    while len(fired) < count - len(idxs[::2]):
+        selectext.wait()
+        waits += 1
+    # the last timer fires at about spread seconds
+    run_time = time.time() - start
+
+    print('%d timers, %d cancelled' % (count, len(idxs[::2])))
+    print('%-10s %10.1f us/timer' % ('set', set_time / count * 1e6))
+    print('%-10s %10.1f us/timer' % ('unset', unset_time / count * 2e6))
+    print('%-10s %10.3f s, %d waits, %.1f us/wait' % ('run', run_time,
+        waits, run_time / waits * 1e6))
+
+
+########################################################################
+# main
+########################################################################
+
+if __name__ == '__main__':
+    main(*[ float(arg) if '.' in arg else int(arg) for arg in sys.argv[1:] ])
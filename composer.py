@@ -25,12 +25,19 @@
 # THE SOFTWARE.
 #
 
+import asyncio
+import functools
 import inspect
+import os
 import sys
 import operator
+import pickle
+import threading
+import time
 
 from abc import ABCMeta, abstractmethod, abstractproperty
-from itertools import chain
+from collections import OrderedDict, deque, namedtuple
+from itertools import chain, islice
 
 try:
     from functools import reduce
@@ -42,21 +49,949 @@ try:
 except ImportError:
     imap=map
 
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, \
+            as_completed
+except ImportError:
+    ProcessPoolExecutor = ThreadPoolExecutor = as_completed = None
+
+
+# callables known to have no side effects, see pure()
+_pure_functions = set([
+    operator.add, operator.sub, operator.mul, operator.truediv,
+    operator.floordiv, operator.mod, operator.pow, operator.neg,
+    operator.pos, operator.abs, operator.invert, operator.and_,
+    operator.or_, operator.xor, operator.lshift, operator.rshift,
+    operator.lt, operator.le, operator.eq, operator.ne, operator.ge,
+    operator.gt, operator.not_, operator.truth, operator.concat,
+    operator.contains, operator.getitem, abs, divmod, len, round ])
+
+
+# callables which work on whole numpy arrays as they do on scalars
+_elementwise = frozenset([
+    operator.add, operator.sub, operator.mul, operator.truediv,
+    operator.floordiv, operator.mod, operator.pow, operator.neg,
+    operator.pos, operator.abs, operator.invert, operator.and_,
+    operator.or_, operator.xor, operator.lshift, operator.rshift,
+    operator.lt, operator.le, operator.eq, operator.ne, operator.ge,
+    operator.gt ])
+
 
 def force_tuple(x):
     return x if isinstance(x, tuple) else (x, )
 
 
+def _is_plain(args, kwargs=None):
+    for arg in args:
+        if isinstance(arg, ComposerBase):
+            return False
+    if kwargs:
+        for arg in kwargs.values():
+            if isinstance(arg, ComposerBase):
+                return False
+    return True
+
+
+def _is_generator(obj):
+    return inspect.isgeneratorfunction(obj) or inspect.isasyncgenfunction(obj)
+
+
+async def _resolve(val):
+    return await val if inspect.isawaitable(val) else val
+
+
+def _map_chunk(func, chunk):
+    return [ func(*force_tuple(args)) for args in chunk ]
+
+
+def _parallel_map(func, it, chunksize, workers, executor, inflight):
+
+    owner = executor is None
+    if owner:
+        executor = ProcessPoolExecutor(workers)
+    it = iter(it)
+    futures = deque()
+    try:
+        while True:
+            # keep at most inflight chunks submitted
+            while len(futures) < inflight:
+                chunk = list(islice(it, chunksize))
+                if not chunk:
+                    break
+                futures.append(executor.submit(_map_chunk, func, chunk))
+            if not futures:
+                return
+            for result in futures.popleft().result():
+                yield result
+    finally:
+        for future in futures:
+            future.cancel()
+        if owner:
+            executor.shutdown()
+
+
+# end of stream marker passed between pipeline stages
+_done = object()
+
+
+def _ordered(items):
+    # items come as (seq, value); values are yielded in seq order
+    pending = {}
+    seq = 0
+    for idx, val in items:
+        pending[idx] = val
+        while seq in pending:
+            yield pending.pop(seq)
+            seq += 1
+
+
+def _pipeline(source, stages, maxsize, workers, stats):
+
+    stop = threading.Event()
+    errors = []
+    queues = [ queue.Queue(maxsize) for _ in range(len(stages) + 1) ]
+    remaining = list(workers)
+    lock = threading.Lock()
+
+    def put(idx, item):
+        # queues[idx] feeds stages[idx], the last one the consumer
+        while not stop.is_set():
+            try:
+                queues[idx].put(item, timeout=0.05)
+            except queue.Full:
+                continue
+            if stats is not None:
+                stats._put(idx, queues[idx].qsize())
+            return True
+        return False
+
+    def get(idx):
+        while True:
+            item = queues[idx].get()
+            if item is _done:
+                # let the other workers of this stage see it too
+                queues[idx].put(_done)
+                return
+            yield item
+
+    def fail(exc):
+        errors.append(exc)
+        stop.set()
+        # wake the consumer, the pending results are not needed
+        while True:
+            try:
+                queues[-1].put_nowait(_done)
+                return
+            except queue.Full:
+                try:
+                    queues[-1].get_nowait()
+                except queue.Empty:
+                    pass
+
+    def finish(idx):
+        with lock:
+            remaining[idx] -= 1
+            last = not remaining[idx]
+        if last:
+            while not stop.is_set():
+                try:
+                    queues[idx + 1].put(_done, timeout=0.05)
+                    return
+                except queue.Full:
+                    pass
+
+    def produce():
+        try:
+            for seq, val in enumerate(source):
+                if not put(0, (seq, val)):
+                    return
+            while not stop.is_set():
+                try:
+                    queues[0].put(_done, timeout=0.05)
+                    return
+                except queue.Full:
+                    pass
+        except BaseException as exc:
+            fail(exc)
+
+    def work(idx, func):
+        try:
+            if isinstance(func, ComposerIterableBase):
+                it = enumerate(func(_ordered(get(idx))))
+            else:
+                it = ((seq, func(*force_tuple(val))) for seq, val in get(idx))
+            for item in it:
+                if stats is not None:
+                    stats._item(idx)
+                if not put(idx + 1, item):
+                    return
+            finish(idx)
+        except BaseException as exc:
+            fail(exc)
+
+    threads = [ threading.Thread(target=produce) ] + \
+            [ threading.Thread(target=work, args=(idx, func)) \
+            for idx, func in enumerate(stages) \
+            for _ in range(workers[idx]) ]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    try:
+        for val in _ordered(iter(queues[-1].get, _done)):
+            if stats is not None:
+                stats._item(len(stages))
+            yield val
+        if errors:
+            raise errors[0]
+    finally:
+        # cancel: stop the stages and unblock the ones waiting on a queue
+        stop.set()
+        while any([ thread.is_alive() for thread in threads ]):
+            for q in queues:
+                try:
+                    while True:
+                        q.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    q.put_nowait(_done)
+                except queue.Full:
+                    pass
+            for thread in threads:
+                thread.join(0.01)
+
+
+def shard_source(obj, count):
+    # a list of at most count iterables which together give the items
+    # of obj in order, or None when obj cannot be split; other sources
+    # split themselves with a composer_shards(count) method
+    if hasattr(obj, 'composer_shards'):
+        return list(obj.composer_shards(count))
+    if isinstance(obj, (list, tuple, range)):
+        count = max(1, min(count, len(obj)))
+        bounds = [ len(obj) * idx // count for idx in range(count + 1) ]
+        return [ obj[start:stop] for start, stop \
+                in zip(bounds, bounds[1:]) ]
+    return None
+
+
+def _run_shard(func):
+    return list(func())
+
+
+def _sharded(funcs, workers, executor, ordered):
+
+    owner = executor is None
+    if owner:
+        executor = ProcessPoolExecutor(workers)
+    futures = []
+    try:
+        futures = [ executor.submit(_run_shard, func) for func in funcs ]
+        for future in futures if ordered else as_completed(futures):
+            for result in future.result():
+                yield result
+    finally:
+        for future in futures:
+            future.cancel()
+        if owner:
+            executor.shutdown()
+
+
+def _union(*sets):
+    return tuple(frozenset(chain(*sets)))
+
+
+def pure(func=None, memo=None):
+    # @pure or @pure(memo=maxsize); with memo the results are kept in
+    # a bounded table keyed by the arguments
+    if func is None:
+        return lambda func: pure(func, memo)
+    if memo is not None:
+        func = _memo(func, memo)
+    _pure_functions.add(func)
+    return func
+
+
+def _memo(func, maxsize):
+    cached = functools.lru_cache(maxsize=maxsize)(func)
+
+    @functools.wraps(func)
+    def _(*args, **kwargs):
+        # unhashable arguments bypass the table
+        try:
+            hash((args, tuple(kwargs.values())))
+        except TypeError:
+            return func(*args, **kwargs)
+        return cached(*args, **kwargs)
+
+    _.cache_info = cached.cache_info
+    _.cache_clear = cached.cache_clear
+    return _
+
+
+def is_pure(func):
+    try:
+        return func in _pure_functions
+    except TypeError:
+        return False
+
+
+def _const_key(val):
+    try:
+        hash(val)
+        return ('const', type(val), val)
+    except TypeError:
+        return ('id', id(val))
+
+
+def _cse_key(node, keys, counts, scope=()):
+    # structural key of a subgraph, relative to the arguments it is
+    # evaluated with; None unless the subgraph is pure.  counts are
+    # per scope, as the downstream of a bind sees different arguments
+
+    def count(key):
+        if key is not None and key[0] not in ('arg', 'kwarg', 'value'):
+            counts[(scope, key)] = counts.get((scope, key), 0) + 1
+        return key
+
+    if not isinstance(node, ComposerBase):
+        return _const_key(node)
+    elif id(node) in keys:
+        return count(keys[id(node)])
+
+    if isinstance(node, ComposerArgs):
+        key = ('arg', node.idx)
+    elif isinstance(node, ComposerKwargs):
+        key = ('kwarg', node.key)
+    elif isinstance(node, ComposerValue):
+        key = ('value', ) + _const_key(node.val)
+    elif isinstance(node, (ComposerFunction, ComposerBuiltin)) and \
+            not isinstance(node, ComposerIterableBase):
+        argkeys = tuple([ _cse_key(arg, keys, counts, scope) \
+                for arg in node.args ])
+        kwkeys = tuple(sorted([ (key, _cse_key(value, keys, counts, scope)) \
+                for key, value in node.kwargs.items() ]))
+        key = (node.__class__.__name__, node.func, argkeys, kwkeys) if \
+                is_pure(node.func) and not node._async and \
+                None not in argkeys and None not in dict(kwkeys).values() \
+                else None
+    elif isinstance(node, ComposerBind):
+        inkey = _cse_key(node.inf, keys, counts, scope)
+        outkey = _cse_key(node.outf, keys, counts, scope + (id(node), ))
+        key = ('bind', inkey, outkey) if \
+                inkey is not None and outkey is not None else None
+    elif isinstance(node, ComposerOr):
+        lkey = _cse_key(node.left, keys, counts, scope)
+        rkey = _cse_key(node.right, keys, counts, scope)
+        key = ('or', lkey, rkey) if \
+                lkey is not None and rkey is not None else None
+    else:
+        key = None
+
+    keys[id(node)] = key
+    return count(key)
+
+
+def _subclasses(cls):
+    for sub in cls.__subclasses__():
+        yield sub
+        for subsub in _subclasses(sub):
+            yield subsub
+
+
+def _profile_name(obj):
+    if isinstance(obj, ComposerBase):
+        func = getattr(obj, 'func', None)
+        return obj.__class__.__name__ + \
+                ('(%s)' % _profile_name(func) if func is not None else '')
+    else:
+        return getattr(obj, '__qualname__', None) or \
+                getattr(obj, '__name__', None) or repr(obj)
+
+
+def _memoize(ev, slot):
+    # memo entries are keyed by the identity of the argument tuple,
+    # which is kept alive by the entry for the whole invocation
+    def _(args, kwargs, memo):
+        if memo is None:
+            return ev(args, kwargs, memo)
+        hit = memo.get((id(args), slot))
+        if hit is None:
+            hit = memo[(id(args), slot)] = (args, ev(args, kwargs, memo))
+        return hit[1]
+    return _
+
+
+_immutable_types = frozenset([ type(None), bool, int, float, complex, str,
+    bytes ])
+
+
+def _immutable(val):
+    # a pure function may still read into a mutable argument later on
+    if isinstance(val, ComposerValue):
+        val = val.val
+    if type(val) in (tuple, frozenset):
+        return all([ _immutable(item) for item in val ])
+    return type(val) in _immutable_types
+
+
+def _foldable(obj):
+    return isinstance(obj, ComposerFunction) and \
+            not isinstance(obj, ComposerIterableBase) and \
+            not obj._argset and not obj._kwargset and not obj._async and \
+            is_pure(obj.func) and \
+            all([ _immutable(arg) for arg in obj.args ]) and \
+            all([ _immutable(arg) for arg in obj.kwargs.values() ])
+
+
+def _folded(obj):
+    # the value of a foldable node, or None when calling it raises and
+    # the error is left to the call
+    try:
+        return (obj(), )
+    except Exception:
+        return None
+
+
+def _fold(obj):
+    # a pure node without placeholders always gives the same value
+    val = _folded(obj) if _foldable(obj) else None
+    return obj if val is None else ComposerValue(val[0])
+
+
+def _fold_arg(obj):
+    val = _folded(obj) if _foldable(obj) else None
+    if val is None:
+        return obj
+    else:
+        val, = val
+        return ComposerValue(val) if isinstance(val, ComposerBase) else val
+
+
+def _compile_arg(arg, executor=None, shared=None):
+    if isinstance(arg, ComposerBase):
+        ev = arg._compile(executor, shared)
+        if shared and id(arg) in shared:
+            ev = _memoize(ev, shared[id(arg)])
+        return ev
+    else:
+        return lambda args, kwargs, memo: arg
+
+
+def _call(func, args, kwargs):
+    return func(*args, **kwargs)
+
+
+def _invoke(func, *args, **kwargs):
+    return func(*args, **kwargs)
+
+
+def _new(cls, args, kwargs):
+    return cls(*args, **kwargs)
+
+
+def dumps_composer(obj, protocol=pickle.HIGHEST_PROTOCOL):
+    return pickle.dumps(obj, protocol)
+
+
+def loads_composer(data):
+    return pickle.loads(data)
+
+
+def _compile_concurrent(nodes, executor, shared):
+
+    evs = [ _compile_arg(node, executor, shared) for node in nodes ]
+    # the first composer runs in the calling thread
+    remote = frozenset([ idx for idx, node in enumerate(nodes) \
+            if isinstance(node, ComposerFunctionBase) ][1:])
+    if not remote:
+        return lambda args, kwargs, memo: \
+                [ ev(args, kwargs, memo) for ev in evs ]
+
+    # closures can not be sent to other processes
+    local = ThreadPoolExecutor is not None and \
+            isinstance(executor, ThreadPoolExecutor)
+    tasks = [ (idx, evs[idx] if local else nodes[idx]) \
+            for idx in sorted(remote) ]
+
+    def _(args, kwargs, memo):
+        futures = [ (idx, executor.submit(task, args, kwargs, memo) \
+                if local else executor.submit(_call, task, args, kwargs)) \
+                for idx, task in tasks ]
+        try:
+            vals = [ None if idx in remote else ev(args, kwargs, memo) \
+                    for idx, ev in enumerate(evs) ]
+        except BaseException:
+            for idx, future in futures:
+                future.cancel()
+            raise
+        for idx, future in futures:
+            # a task still in the queue is run here, so that nested
+            # evaluations never wait on a pool with no free worker
+            vals[idx] = evs[idx](args, kwargs, memo) if future.cancel() \
+                    else future.result()
+        return vals
+    return _
+
+
+def _apply(node, args, kwargs):
+    # node.apply(*args, **kwargs) with an explicit stack for the bind
+    # and or nodes, so deep chains do not hit the recursion limit
+    stack = [ (node, args, False) ]
+    out = []
+    while stack:
+        node, args, visited = stack.pop()
+        cls = node.__class__
+        if cls is ComposerBind:
+            if visited:
+                outf = out.pop()
+                inf = out.pop()
+                out.append(node if inf is node.inf and outf is node.outf \
+                        else ComposerBind(inf, outf))
+            else:
+                stack.append((node, args, True))
+                stack.append((node.outf, (), False))
+                stack.append((node.inf, args, False))
+        elif cls is ComposerOr:
+            if visited:
+                right = out.pop()
+                left = out.pop()
+                out.append(node if left is node.left and \
+                        right is node.right else ComposerOr(left, right))
+            else:
+                stack.append((node, args, True))
+                stack.append((node.right, args, False))
+                stack.append((node.left, args, False))
+        else:
+            out.append(node.apply(*args, **kwargs))
+    return out[0]
+
+
+def _run(node):
+    stack = [ (node, False) ]
+    out = []
+    while stack:
+        node, visited = stack.pop()
+        cls = node.__class__
+        if cls is ComposerBind:
+            if visited:
+                out.append(node.outf(*force_tuple(out.pop())))
+            else:
+                stack.append((node, True))
+                stack.append((node.inf, False))
+        elif cls is ComposerOr:
+            if visited:
+                right = out.pop()
+                out[-1] = _pair(out[-1], right)
+            else:
+                stack.append((node, True))
+                stack.append((node.right, False))
+                stack.append((node.left, False))
+        else:
+            out.append(node.run())
+    return out[0]
+
+
+def _fuse(funcs):
+    # map stages f, g, h as one function: h(*g(*f(*args)))
+    first = funcs[0].compile()
+    rest = [ func.compile() for func in funcs[1:] ]
+
+    def _(*args):
+        val = first(*args)
+        for func in rest:
+            val = func(*val) if isinstance(val, tuple) else func(val)
+        return val
+    return _
+
+
+class _Partial(object):
+    # a partially applied node met by _evaluate(), where a nested
+    # argument gave a composer; apply() would have returned it
+    __slots__ = ('node', )
+
+    def __init__(self, node):
+        self.node = node
+
+
+def _unwrap(val):
+    return val.node if val.__class__ is _Partial else val
+
+
+def _side(val):
+    # the other side of a partial ComposerOr keeps its value
+    return val.node if val.__class__ is _Partial else ComposerValue(val)
+
+
+def _is_nested(arg):
+    # whether an argument can evaluate to a composer
+    if isinstance(arg, ComposerValue):
+        return isinstance(arg.val, ComposerBase)
+    return isinstance(arg, ComposerBase) and \
+            not isinstance(arg, (ComposerArgs, ComposerKwargs))
+
+
+def _composed(val):
+    return isinstance(val, ComposerBase) or val.__class__ is _Partial
+
+
+def _call_checked(node, newargs, newkwargs):
+    for val in chain(newargs, newkwargs.values()):
+        if _composed(val):
+            return _partial(node, newargs, newkwargs)
+    return node.func(*newargs, **newkwargs)
+
+
+def _pair(left, right):
+    if _Partial in (left.__class__, right.__class__):
+        return _Partial(ComposerOr(_side(left), _side(right)))
+    return (left, right)
+
+
+def _partial(node, newargs, newkwargs):
+    # node called with its arguments resolved, some of them to composers:
+    # partially applied as apply() leaves it, or run as run() does
+    newargs = [ _unwrap(val) for val in newargs ]
+    newkwargs = dict([ (key, _unwrap(val)) \
+            for key, val in newkwargs.items() ])
+    partial = node.__class__(node.func, *newargs, **newkwargs)
+    if partial._argset or partial._kwargset:
+        return _Partial(partial)
+    return node.func(*newargs, **newkwargs)
+
+
+def _evaluate(node, args, kwargs):
+    # node(*args, **kwargs) for a node the arguments apply fully, without
+    # building the applied graph; gives what apply() and run() give
+    stack = [ (node, args, False) ]
+    out = []
+    push = stack.append
+    pop = stack.pop
+    emit = out.append
+    while stack:
+        node, args, visited = pop()
+        cls = node.__class__
+        if cls is ComposerFunction:
+            slots = node._slots
+            kwslots = node._kwslots
+            if not slots and not kwslots:
+                emit(node.func(*node.args, **node.kwargs))
+            elif visited:
+                count = len(slots) + len(kwslots)
+                vals = out[-count:]
+                del out[-count:]
+                newargs = list(node.args)
+                for idx, val in zip(slots, vals):
+                    newargs[idx] = val
+                if not _is_plain(vals) or _Partial in \
+                        [ val.__class__ for val in vals ]:
+                    newkwargs = dict(node.kwargs)
+                    for key, val in zip(kwslots, vals[len(slots):]):
+                        newkwargs[key] = val
+                    emit(_partial(node, newargs, newkwargs))
+                elif kwslots:
+                    newkwargs = dict(node.kwargs)
+                    for key, val in zip(kwslots, vals[len(slots):]):
+                        newkwargs[key] = val
+                    emit(node.func(*newargs, **newkwargs))
+                else:
+                    emit(node.func(*newargs, **node.kwargs))
+            else:
+                push((node, args, True))
+                for key in reversed(kwslots):
+                    push((node.kwargs[key], args, False))
+                for idx in reversed(slots):
+                    push((node.args[idx], args, False))
+        elif cls is ComposerArgs:
+            emit(args[node.idx])
+        elif cls is ComposerKwargs:
+            emit(kwargs[node.key])
+        elif cls is ComposerValue:
+            emit(node.val)
+        elif cls is ComposerBind:
+            if visited:
+                result = out.pop()
+                if result.__class__ is _Partial:
+                    emit(_Partial(ComposerBind(result.node,
+                        node.outf.apply(**kwargs))))
+                    continue
+                result = force_tuple(result)
+                outf = node.outf
+                argset = outf._argset
+                if (not argset or len(result) > max(argset)) and \
+                        _is_plain(result):
+                    push((outf, result, False))
+                else:
+                    emit(outf(*result, **kwargs))
+            else:
+                push((node, args, True))
+                push((node.inf, args, False))
+        elif cls is ComposerOr:
+            if visited:
+                right = out.pop()
+                out[-1] = _pair(out[-1], right)
+            else:
+                push((node, args, True))
+                push((node.right, args, False))
+                push((node.left, args, False))
+        else:
+            emit(node(*args, **kwargs))
+    return _unwrap(out[0])
+
+
+def _is_elementwise(func):
+    try:
+        return func in _elementwise or isinstance(func, numpy.ufunc)
+    except TypeError:
+        return False
+
+
+def _is_numeric(val):
+    if isinstance(val, numpy.ndarray):
+        return val.dtype.kind in 'biufc'
+    else:
+        return isinstance(val, (int, float, complex, numpy.number))
+
+
+# elementwise ops which treat bools as logical values like python does
+_logical = frozenset([ operator.and_, operator.or_, operator.xor,
+    operator.lt, operator.le, operator.eq, operator.ne, operator.ge,
+    operator.gt ])
+
+
+def _as_int(arr):
+    # numpy adds and inverts bools logically, python as 0 and 1
+    return arr.astype(int) if arr.dtype.kind == 'b' else arr
+
+
+def _int_range(arr):
+    if arr.ndim == 0:
+        return int(arr), int(arr)
+    return (int(arr.min()), int(arr.max())) if arr.size else (0, 0)
+
+
+_int_info = {}
+
+
+def _int_bounds(dtype):
+    info = _int_info.get(dtype)
+    if info is None:
+        info = numpy.iinfo(dtype)
+        info = _int_info[dtype] = (int(info.min), int(info.max))
+    return info
+
+
+def _int_result_range(func, ranges):
+    # bounds of the exact integer result over the argument ranges, or
+    # None when they are not known
+    (alo, ahi), (blo, bhi) = (ranges + [ (0, 0) ])[:2]
+    m = max(abs(alo), abs(ahi))
+    if func is operator.add:
+        return alo + blo, ahi + bhi
+    elif func is operator.sub:
+        return alo - bhi, ahi - blo
+    elif func is operator.mul:
+        corners = [ alo * blo, alo * bhi, ahi * blo, ahi * bhi ]
+        return min(corners), max(corners)
+    elif func is operator.pow:
+        if blo < 0 or (m > 1 and bhi * m.bit_length() > 128):
+            return None
+        return -(m ** bhi), m ** bhi
+    elif func is operator.lshift:
+        if blo < 0 or bhi > 128:
+            return None
+        return min(alo, alo << bhi), max(ahi, ahi << bhi)
+    elif func is operator.rshift:
+        return None if blo < 0 else (min(alo, 0), max(ahi, 0))
+    elif func is operator.floordiv:
+        return -m, m
+    elif func is operator.mod:
+        return -max(abs(blo), abs(bhi)), max(abs(blo), abs(bhi))
+    elif func in (operator.neg, operator.pos, operator.abs):
+        return -m, m
+    elif func is operator.invert:
+        return ~ahi, ~alo
+    elif func in (operator.and_, operator.or_, operator.xor):
+        bits = max(m, abs(blo), abs(bhi)).bit_length()
+        return -(1 << bits), (1 << bits) - 1
+    return None
+
+
+def _exact(func, arrays, result):
+    # whether the array result equals the python result row by row;
+    # integer arrays wrap around where python ints grow
+    kind = result.dtype.kind
+    ints = all([ arr.dtype.kind in 'biu' for arr in arrays ])
+    if kind in 'iu':
+        bounds = _int_result_range(func, [ _int_range(arr) \
+                for arr in arrays ]) if ints else None
+        if bounds is None:
+            return False
+        lo, hi = _int_bounds(result.dtype)
+        return lo <= bounds[0] and bounds[1] <= hi
+    elif kind in 'fc' and ints:
+        return func is operator.truediv
+    return True
+
+
+def _broadcast(col, size):
+    col = numpy.asarray(col)
+    return numpy.repeat(col, size) if col.ndim == 0 else col
+
+
+def _batch_loop(ev, columns, kwargs, size):
+    rows = zip(*[ _broadcast(col, size).tolist() for col in columns ]) \
+            if columns else [ () ] * size
+    result = [ _unwrap(ev(row, kwargs, None)) for row in rows ]
+    if result and all([ isinstance(val, tuple) and \
+            len(val) == len(result[0]) for val in result ]):
+        return tuple([ _batch_column(col) for col in zip(*result) ])
+    else:
+        return _batch_column(result)
+
+
+# python types which a numpy dtype holds without changing the values
+_exact_dtypes = { bool: numpy.bool_, int: numpy.int64,
+    float: numpy.float64, complex: numpy.complex128 } \
+            if numpy is not None else {}
+
+
+def _batch_column(result):
+    # one entry per row; values of mixed types, ints out of int64 range
+    # and anything else stay python objects
+    types = frozenset([ val.__class__ for val in result ])
+    dtype = _exact_dtypes.get(next(iter(types))) if len(types) == 1 \
+            else None
+    if dtype is numpy.int64 and not \
+            (-2 ** 63 <= min(result) and max(result) < 2 ** 63):
+        dtype = None
+    if dtype is not None:
+        return numpy.array(result, dtype=dtype)
+    col = numpy.empty(len(result), dtype=object)
+    for idx, val in enumerate(result):
+        col[idx] = val
+    return col
+
+
+# builtin -> (required positional parameters, required keyword-only
+# parameters), or None when the builtin has no signature
+_builtin_signatures = {}
+
+
+def _builtin_key(func):
+    # bound builtin methods share the signature of their type's method,
+    # classmethods are bound to the class itself
+    owner = getattr(func, '__self__', None)
+    if owner is None or inspect.ismodule(owner):
+        return func
+    elif isinstance(owner, type):
+        return (owner, getattr(func, '__name__', None))
+    else:
+        return (type(owner), getattr(func, '__name__', None))
+
+
+def get_builtin_signature(func):
+    try:
+        key = _builtin_key(func)
+        return _builtin_signatures[key]
+    except KeyError:
+        pass
+    except TypeError:
+        key = None
+
+    try:
+        params = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        sig = None
+    else:
+        positional = (inspect.Parameter.POSITIONAL_ONLY,
+                inspect.Parameter.POSITIONAL_OR_KEYWORD)
+        sig = (tuple([ (param.name, param.kind) for param in params \
+                    if param.kind in positional and \
+                    param.default is param.empty ]),
+                tuple([ param.name for param in params \
+                    if param.kind == inspect.Parameter.KEYWORD_ONLY and \
+                    param.default is param.empty ]))
+
+    if key is not None:
+        _builtin_signatures[key] = sig
+    return sig
+
+
+# (code object, bound) -> (number of required positional parameters,
+# names of required keyword-only parameters)
+_signatures = {}
+
+
+def _signature_key(func):
+    # wrapped functions do not have the signature of their code object
+    if hasattr(func, '__wrapped__') or hasattr(func, '__signature__'):
+        return None
+    elif inspect.isfunction(func):
+        return (func.__code__, False)
+    elif inspect.ismethod(func) and inspect.isfunction(func.__func__):
+        return (func.__func__.__code__, True)
+    elif not isinstance(func, type) and \
+            inspect.isfunction(getattr(type(func), '__call__', None)):
+        # instances share the signature of their class's __call__
+        return (type(func).__call__.__code__, True)
+    else:
+        return None
+
+
+def get_signature(func):
+    key = _signature_key(func)
+    sig = _signatures.get(key) if key is not None else None
+    if sig is not None:
+        return sig
+
+    params = inspect.signature(func).parameters.values()
+    positional = (inspect.Parameter.POSITIONAL_ONLY,
+            inspect.Parameter.POSITIONAL_OR_KEYWORD)
+    sig = (len([ param for param in params \
+                if param.kind in positional and \
+                param.default is param.empty ]),
+            tuple([ param.name for param in params \
+                if param.kind == inspect.Parameter.KEYWORD_ONLY and \
+                param.default is param.empty ]))
+
+    if key is not None:
+        _signatures[key] = sig
+    return sig
+
+
 def get_nargs(func):
-    def _len(x): return len(x) if x else 0
-    _spec = inspect.getargspec(func)
-    return _len(_spec.args) - _len(_spec.defaults)
+    return get_signature(func)[0]
+
+
+def _from_signature(cls, obj, func):
+    try:
+        nargs, kwonly = get_signature(func)
+    except (TypeError, ValueError):
+        # some builtin types have no signature, they are called as given
+        nargs, kwonly = 0, ()
+    return cls(obj, *[ ComposerArgs(idx) for idx in range(0, nargs) ],
+            **dict([ (key, ComposerKwargs(key)) for key in kwonly ]))
 
 
 def composer(obj, *args, **kwargs):
 
     if args or kwargs:
-        if inspect.isgeneratorfunction(obj):
+        args = [ _fold_arg(arg) for arg in args ]
+        kwargs = dict([ (key, _fold_arg(value)) \
+                for key, value in kwargs.items() ])
+        if _is_generator(obj):
             return ComposerIterableFunction(obj, *args, **kwargs)
         elif callable(obj):
             return ComposerFunction(obj, *args, **kwargs)
@@ -71,22 +1006,14 @@ def composer(obj, *args, **kwargs):
             return ComposerKwargs(obj)
         elif inspect.isbuiltin(obj):
             return ComposerBuiltin(obj)
-        elif inspect.isgeneratorfunction(obj):
-            return ComposerIterableFunction(obj, \
-                    *(tuple([ ComposerArgs(idx) for idx in \
-                    range(0, get_nargs(obj)) ])))
+        elif _is_generator(obj):
+            return _from_signature(ComposerIterableFunction, obj, obj)
         elif inspect.isfunction(obj):
-            return ComposerFunction(obj, \
-                    *(tuple([ ComposerArgs(idx) for idx in \
-                    range(0, get_nargs(obj)) ])))
+            return _from_signature(ComposerFunction, obj, obj)
         elif inspect.ismethod(obj): # classmethod
-            return ComposerFunction(obj, \
-                    *(tuple([ ComposerArgs(idx) for idx in \
-                    range(0, get_nargs(obj) - 1) ])))
+            return _from_signature(ComposerFunction, obj, obj)
         elif callable(obj): # callbale but not function nor method
-            return ComposerFunction(obj, \
-                    *(tuple([ ComposerArgs(idx) for idx in \
-                    range(0, get_nargs(obj.__call__) - 1) ])))
+            return _from_signature(ComposerFunction, obj, obj)
         elif hasattr(obj, '__iter__'): # iterable (except str)
             return ComposerIterable(obj)
         else:
@@ -103,22 +1030,14 @@ def iterable_composer(obj, *args, **kwargs):
     else:
         if isinstance(obj, ComposerBase):
             return obj
-        elif inspect.isgeneratorfunction(obj):
-            return ComposerIterableFunction(obj, \
-                    *(tuple([ ComposerArgs(idx) for idx in \
-                    range(0, get_nargs(obj)) ])))
+        elif _is_generator(obj):
+            return _from_signature(ComposerIterableFunction, obj, obj)
         elif inspect.isfunction(obj):
-            return ComposerIterableFunction(obj, \
-                    *(tuple([ ComposerArgs(idx) for idx in \
-                    range(0, get_nargs(obj)) ])))
+            return _from_signature(ComposerIterableFunction, obj, obj)
         elif inspect.ismethod(obj): # classmethod
-            return ComposerIterableFunction(obj, \
-                    *(tuple([ ComposerArgs(idx) for idx in \
-                    range(0, get_nargs(obj) - 1) ])))
+            return _from_signature(ComposerIterableFunction, obj, obj)
         elif callable(obj): # callbale but not function nor method
-            return ComposerIterableFunction(obj, \
-                    *(tuple([ ComposerArgs(idx) for idx in \
-                    range(0, get_nargs(obj.__call__) - 1) ])))
+            return _from_signature(ComposerIterableFunction, obj, obj)
         elif hasattr(obj, '__iter__'): # iterable (except str)
             return ComposerIterable(obj)
         else:
@@ -127,15 +1046,21 @@ def iterable_composer(obj, *args, **kwargs):
 
 class ComposerBase(object):
     __metaclass__ = ABCMeta
+    # nodes are never changed once built, apply() makes new ones
+    __slots__ = ()
+
+    # placeholder index, computed once when a node is created
+    _argset = ()
+    _kwargset = ()
+    # True when run() returns an awaitable
+    _async = False
 
-    @abstractmethod
     def getArgSet(self):
-        raise NotImplementedError()
+        return self._argset
 
-    @abstractmethod
     def getKwargSet(self):
-        raise NotImplementedError()
-        
+        return self._kwargset
+
     @abstractmethod
     def __call__(self, *args, **kwargs):
         raise NotImplementedError()
@@ -149,15 +1074,59 @@ class ComposerBase(object):
         return self.getKwargSet()
 
     def __or__(self, right):
-        return ComposerOr(self, right)
+        return ComposerOr(_fold(self), _fold(right))
+
+    def _compile(self, executor=None, shared=None):
+        # fallback for the nodes which have no flat form
+        return lambda args, kwargs, memo: self(*args, **kwargs)
+
+    def _batch(self, columns, kwargs, size):
+        return _batch_loop(self._compile(), columns, kwargs, size)
+
+    def _flat(self, executor=None):
+        # (evaluator, shared) or None when there is no flat form
+        if self._async:
+            return None
+
+        # pure subgraphs found more than once are evaluated once per call
+        keys = {}
+        counts = {}
+        try:
+            _cse_key(self, keys, counts)
+            slots = dict([ (key, slot) for slot, key in \
+                    enumerate(frozenset([ key for (scope, key), count \
+                    in counts.items() if count > 1 ])) ])
+            shared = dict([ (idx, slots[key]) for idx, key in keys.items() \
+                    if key in slots ])
+            return _compile_arg(self, executor, shared), shared
+        except RecursionError:
+            # too deep for nested closures, __call__ evaluates it flat
+            return None
+
+    def compile(self, executor=None):
+        flat = self._flat(executor)
+        if flat is None:
+            return lambda *args, **kwargs: self(*args, **kwargs)
+
+        argset = self.getArgSet()
+        nargs = max(argset) + 1 if argset else 0
+        kwnames = frozenset(self.getKwargSet())
+        ev, shared = flat
 
-    def __invert__(self):
         def _(*args, **kwargs):
-            return self(*args, **kwargs)
+            if len(args) >= nargs and kwnames <= kwargs.keys() and \
+                    _profiler is None and _is_plain(args, kwargs):
+                return _unwrap(ev(args, kwargs, {} if shared else None))
+            else:
+                return self(*args, **kwargs)
         return _
 
+    def __invert__(self):
+        return functools.partial(_invoke, self)
+
 
 class ComposerFunctionBase(ComposerBase):
+    __slots__ = ()
 
     @abstractmethod
     def apply(self, *args, **kwargs):
@@ -172,196 +1141,771 @@ class ComposerFunctionBase(ComposerBase):
         raise NotImplementedError()
 
     def __call__(self, *args, **kwargs):
+        argset = self._argset
+        if self.__class__ in _evaluated and not self._async and \
+                (not argset or len(args) > max(argset)) and \
+                kwargs.keys() >= frozenset(self._kwargset) and \
+                _profiler is None and _is_plain(args, kwargs):
+            return _evaluate(self, args, kwargs)
         func = self.apply(*args, **kwargs)
-        return func if len(func.getArgSet()) != 0 or \
-                len(func.getKwargSet()) != 0 else func.run()
+        return func if func._argset or func._kwargset else func.run()
 
     def __rshift__(self, func):
-        return self.bind(func)
+        return _fold(self).bind(_fold(func))
+
+    def cached(self, maxsize=128):
+        return ComposerCache(self, maxsize)
+
+    def adaptive(self, threshold=8, maxsigs=8):
+        return ComposerAdaptive(self, threshold, maxsigs)
+
+    def map_batch(self, *columns, **kwargs):
+        # a numpy array with the result of each row, or a list without
+        # numpy; whole-array evaluation needs numeric columns of the
+        # same length, otherwise the graph is called per row
+        size = len(columns[0]) if columns else 0
+        nargs = max(self._argset) + 1 if self._argset else 0
+        if numpy is not None and size > 0 and len(columns) >= nargs and \
+                all([ len(col) == size for col in columns ]) and \
+                kwargs.keys() >= frozenset(self._kwargset) and \
+                _is_plain((), kwargs):
+            arrays = tuple([ numpy.asarray(col) for col in columns ])
+            if all([ _is_numeric(arr) and arr.ndim == 1 for arr in arrays ]):
+                result = self._batch(arrays, kwargs, size)
+                if isinstance(result, tuple):
+                    return _batch_column(list(zip(*[ \
+                            _broadcast(col, size).tolist() \
+                            for col in result ])))
+                else:
+                    return _broadcast(result, size)
+
+        func = self.compile()
+        result = [ func(*row, **kwargs) for row in zip(*columns) ]
+        return result if numpy is None else _batch_column(result)
 
 
 class ComposerArgs(ComposerBase):
+    __slots__ = ('idx', '_argset')
 
     def __init__(self, idx):
         self.idx = idx
+        self._argset = (idx, )
+
+    def __reduce__(self):
+        return (self.__class__, (self.idx, ))
 
     def __call__(self, *args, **kwargs):
+        if not args:
+            return self
         return args[self.idx] if self.idx < len(args) else \
                 ComposerArgs(self.idx - len(args))
 
-    def getArgSet(self):
-        return (self.idx, )
+    def _compile(self, executor=None, shared=None):
+        idx = self.idx
+        return lambda args, kwargs, memo: args[idx]
 
-    def getKwargSet(self):
-        return ()
+    def _batch(self, columns, kwargs, size):
+        return columns[self.idx]
 
 
 class ComposerKwargs(ComposerBase):
+    __slots__ = ('key', '_kwargset')
 
     def __init__(self, key):
         self.key = key
+        self._kwargset = (key, )
+
+    def __reduce__(self):
+        return (self.__class__, (self.key, ))
 
     def __call__(self, *args, **kwargs):
          return kwargs[self.key] if self.key in kwargs else self
 
-    def getArgSet(self):
-        return ()
+    def _compile(self, executor=None, shared=None):
+        key = self.key
+        return lambda args, kwargs, memo: kwargs[key]
 
-    def getKwargSet(self):
-        return (self.key,)
+    def _batch(self, columns, kwargs, size):
+        return kwargs[self.key]
 
 
 class ComposerValue(ComposerFunctionBase):
+    __slots__ = ('val', )
 
     def __init__(self, val):
         self.val = val
 
-    def getArgSet(self):
-        return ()
+    def __reduce__(self):
+        return (self.__class__, (self.val, ))
 
-    def getKwargSet(self):
-        return ()
-        
     def apply(self, *args, **kwargs):
         return self
 
     def run(self, *args, **kwargs):
         return self.val
 
-    def bind(self, func):
-        raise NotImplementedError()
+    def _compile(self, executor=None, shared=None):
+        val = self.val
+        return lambda args, kwargs, memo: val
+
+    def _batch(self, columns, kwargs, size):
+        return self.val
+
+    def bind(self, outf):
+        return ComposerBind(self, outf)
 
     def __invert__(self):
         return self.val
 
 
 class ComposerFunction(ComposerFunctionBase):
+    __slots__ = ('func', 'args', 'kwargs', '_slots', '_kwslots',
+            '_argset', '_kwargset', '_nested', '_async')
 
     def __init__(self, func, *args, **kwargs):
         self.func = func
         self.args = args
         self.kwargs = kwargs
 
-    def getArgSet(self):
-        return tuple(frozenset(reduce(operator.add, \
-                [ arg.getArgSet() for arg in chain( \
-                self.args, self.kwargs.values()) \
-                if isinstance(arg, ComposerBase) ], ())))
+        # where the composers sit in args and kwargs
+        self._slots = tuple([ idx for idx, arg in enumerate(args) \
+                if isinstance(arg, ComposerBase) ])
+        self._kwslots = tuple([ key for key, value in kwargs.items() \
+                if isinstance(value, ComposerBase) ])
+        composers = [ args[idx] for idx in self._slots ] + \
+                [ kwargs[key] for key in self._kwslots ]
+        self._argset = _union(*[ arg._argset for arg in composers ])
+        self._kwargset = _union(*[ arg._kwargset for arg in composers ])
+        # nested composers are evaluated on every application
+        self._nested = any([ not isinstance(arg, (ComposerArgs, \
+                ComposerKwargs)) for arg in composers ])
+        self._async = inspect.iscoroutinefunction(func) or \
+                any([ arg._async for arg in composers ])
+
+    def __reduce__(self):
+        # the placeholder index is rebuilt by __init__
+        return (_new, (self.__class__, (self.func, ) + self.args,
+            self.kwargs)) if self.kwargs else \
+                    (self.__class__, (self.func, ) + self.args)
 
-    def getKwargSet(self):
-        return tuple(frozenset(reduce(operator.add, \
-                [arg.getKwargSet() for arg in chain( \
-                self.args, self.kwargs.values()) \
-                if isinstance(arg, ComposerBase)], ())))
-        
     def apply(self, *args, **kwargs):
 
-        def replaceArg(arg, *args, **kwargs):
-            return arg(*args, **kwargs) if \
-                    isinstance(arg, ComposerBase) else arg
+        def replaceArg(arg):
+            # async composers are awaited by run(), not evaluated here
+            return arg.apply(*args, **kwargs) if arg._async and \
+                    isinstance(arg, ComposerFunctionBase) else \
+                    arg(*args, **kwargs)
+
+        if not self._nested and not (args and self._argset) and \
+                kwargs.keys().isdisjoint(self._kwargset):
+            return self
+
+        newargs = list(self.args)
+        for idx in self._slots:
+            newargs[idx] = replaceArg(newargs[idx])
+        newkwargs = dict(self.kwargs)
+        for key in self._kwslots:
+            newkwargs[key] = replaceArg(newkwargs[key])
 
-        return self.__class__(self.func, \
-            *(tuple([replaceArg(arg, *args, **kwargs) \
-                for arg in self.args])), \
-            **(dict([(key, replaceArg(value, *args, **kwargs)) \
-                for key, value in self.kwargs.items() ])))
+        return self.__class__(self.func, *newargs, **newkwargs)
 
     def run(self):
+        if self._async:
+            return self._arun()
         return self.func(*self.args, **self.kwargs)
 
+    async def _arun(self):
+
+        def isAsync(arg):
+            return isinstance(arg, ComposerFunctionBase) and arg._async
+
+        args = list(self.args)
+        kwargs = dict(self.kwargs)
+        slots = [ idx for idx in self._slots if isAsync(args[idx]) ]
+        kwslots = [ key for key in self._kwslots if isAsync(kwargs[key]) ]
+        vals = await asyncio.gather(*[ _resolve(arg.run()) for arg in \
+                [ args[idx] for idx in slots ] + \
+                [ kwargs[key] for key in kwslots ] ])
+        for idx, val in zip(slots + kwslots, vals):
+            if isinstance(idx, int):
+                args[idx] = val
+            else:
+                kwargs[idx] = val
+
+        return await _resolve(self.func(*args, **kwargs))
+
+    def _compile(self, executor=None, shared=None):
+        func = self.func
+
+        if executor is not None and len([ arg for arg in chain(self.args, \
+                self.kwargs.values()) \
+                if isinstance(arg, ComposerFunctionBase) ]) > 1:
+            nargs = len(self.args)
+            keys = tuple(self.kwargs.keys())
+            ev = _compile_concurrent(self.args + \
+                    tuple(self.kwargs.values()), executor, shared)
+
+            def _(args, kwargs, memo):
+                vals = ev(args, kwargs, memo)
+                return _call_checked(self, vals[:nargs],
+                        dict(zip(keys, vals[nargs:])))
+            return _
+
+        evs = tuple([ _compile_arg(arg, executor, shared) \
+                for arg in self.args ])
+        kwevs = tuple([ (key, _compile_arg(value, executor, shared)) \
+                for key, value in self.kwargs.items() ])
+
+        if any([ _is_nested(arg) for arg in \
+                chain(self.args, self.kwargs.values()) ]):
+            # a nested composer may give a composer, which leaves this
+            # node partially applied
+            node = self
+            return lambda args, kwargs, memo: _call_checked(node, \
+                    [ ev(args, kwargs, memo) for ev in evs ], \
+                    dict([ (key, ev(args, kwargs, memo)) \
+                    for key, ev in kwevs ]))
+        elif kwevs:
+            return lambda args, kwargs, memo: func( \
+                    *[ ev(args, kwargs, memo) for ev in evs ], \
+                    **dict([ (key, ev(args, kwargs, memo)) \
+                    for key, ev in kwevs ]))
+        elif len(evs) == 0:
+            return lambda args, kwargs, memo: func()
+        elif len(evs) == 1:
+            ev0, = evs
+            return lambda args, kwargs, memo: func(ev0(args, kwargs, memo))
+        elif len(evs) == 2:
+            ev0, ev1 = evs
+            return lambda args, kwargs, memo: func(ev0(args, kwargs, memo), \
+                    ev1(args, kwargs, memo))
+        else:
+            return lambda args, kwargs, memo: func( \
+                    *[ ev(args, kwargs, memo) for ev in evs ])
+
+    def _batch(self, columns, kwargs, size):
+
+        def batchArg(arg):
+            return arg._batch(columns, kwargs, size) if \
+                    isinstance(arg, ComposerBase) else arg
+
+        if _is_elementwise(self.func):
+            args = [ batchArg(arg) for arg in self.args ]
+            kwvals = dict([ (key, batchArg(value)) \
+                    for key, value in self.kwargs.items() ])
+            if all([ _is_numeric(val) for val in \
+                    chain(args, kwvals.values()) ]):
+                result = self._batch_call(args, kwvals)
+                if result is not None:
+                    return result[0]
+        return ComposerBase._batch(self, columns, kwargs, size)
+
+    def _batch_call(self, args, kwvals):
+        # the result of the whole-array call, or None where it differs
+        # from calling per row
+        func = self.func
+        if func in _elementwise and not kwvals:
+            try:
+                arrays = [ numpy.asarray(arg) for arg in args ]
+                if func not in _logical:
+                    args = [ _as_int(arr) if arr.dtype.kind == 'b' else \
+                            arg for arg, arr in zip(args, arrays) ]
+                    arrays = [ _as_int(arr) for arr in arrays ]
+                with numpy.errstate(all='raise'):
+                    result = func(*args)
+            except (ArithmeticError, ValueError, TypeError):
+                return None
+            return (result, ) if _exact(func, arrays, \
+                    numpy.asarray(result)) else None
+        try:
+            # numpy ufuncs are numpy semantics row by row too
+            with numpy.errstate(all='raise'):
+                return (func(*args, **kwvals), )
+        except (ArithmeticError, ValueError, TypeError):
+            return None
+
     def bind(self, outf):
         return ComposerBind(self, outf)
 
 
 class ComposerBuiltin(ComposerFunctionBase):
+    __slots__ = ('func', 'args', 'kwargs')
 
     def __init__(self, func, *args, **kwargs):
         self.func = func
         self.args = args
         self.kwargs = kwargs
 
-    def getArgSet(self): return ()
-
-    def getKwargSet(self): return ()
+    def __reduce__(self):
+        return (_new, (self.__class__, (self.func, ) + self.args,
+            self.kwargs)) if self.kwargs else \
+                    (self.__class__, (self.func, ) + self.args)
 
     def apply(self, *args, **kwargs):
-        self.kwargs.update(kwargs)
+        if not args and not kwargs:
+            return self
+        newkwargs = dict(self.kwargs)
+        newkwargs.update(kwargs)
         return ComposerBuiltin(self.func,
-                *(self.args + args), **(self.kwargs))
+                *(self.args + args), **newkwargs)
 
     def run(self):
-        for nargs in range(0, len(self.args)+1):
-            try:
-                return self.func(*self.args[0:nargs], **self.kwargs)
-            except TypeError:
-                continue
-        return self
+        sig = get_builtin_signature(self.func)
+        if sig is None:
+            for nargs in range(0, len(self.args)+1):
+                try:
+                    return self.func(*self.args[0:nargs], **self.kwargs)
+                except TypeError:
+                    continue
+            return self
+
+        required, kwonly = sig
+        if self.kwargs:
+            # parameters given by keyword are not taken from args
+            nargs = len([ name for name, kind in required \
+                    if kind == inspect.Parameter.POSITIONAL_ONLY or \
+                    name not in self.kwargs ])
+            if any([ name not in self.kwargs for name in kwonly ]):
+                return self
+        elif kwonly:
+            return self
+        else:
+            nargs = len(required)
+
+        return self.func(*self.args[0:nargs], **self.kwargs) \
+                if len(self.args) >= nargs else self
 
     def bind(self, outf):
         return ComposerBind(self, outf)
 
 class ComposerBind(ComposerFunctionBase):
+    __slots__ = ('inf', 'outf', '_argset', '_kwargset', '_async')
 
     def __init__(self, inf, outf):
         self.inf = inf
         self.outf = outf
+        self._argset = inf._argset
+        self._kwargset = _union(inf._kwargset, outf._kwargset)
+        self._async = inf._async or outf._async
 
-    def getArgSet(self):
-        return self.inf.getArgSet()
-
-    def getKwargSet(self):
-        return tuple(frozenset(self.inf.getKwargSet() + \
-                self.outf.getKwargSet()))
+    def __reduce__(self):
+        return (self.__class__, (self.inf, self.outf))
 
     def apply(self, *args, **kwargs):
-        return ComposerBind(self.inf.apply(*args, **kwargs), \
-            self.outf.apply(**kwargs))
+        return _apply(self, args, kwargs)
 
     def run(self):
+        if self._async:
+            return self._arun()
+        elif _profiler is None:
+            return _run(self)
         return self.outf(*force_tuple(self.inf.run()))
 
+    async def _arun(self):
+        result = await _resolve(self.inf.run())
+        return await _resolve(self.outf(*force_tuple(result)))
+
+    def _compile(self, executor=None, shared=None):
+        inev = _compile_arg(self.inf, executor, shared)
+        outev = _compile_arg(self.outf, executor, shared)
+        outf = self.outf
+        argset = outf.getArgSet()
+        nargs = max(argset) + 1 if argset else 0
+
+        def _(args, kwargs, memo):
+            result = inev(args, kwargs, memo)
+            if result.__class__ is _Partial:
+                return _Partial(ComposerBind(result.node,
+                    outf.apply(**kwargs)))
+            result = force_tuple(result)
+            if len(result) >= nargs and _is_plain(result):
+                return outev(result, kwargs, memo)
+            else:
+                return outf(*result, **kwargs)
+        return _
+
+    def _batch(self, columns, kwargs, size):
+        result = self.inf._batch(columns, kwargs, size)
+        result = result if isinstance(result, tuple) else (result, )
+        outf = self.outf
+        if len(result) > (max(outf._argset) if outf._argset else -1) and \
+                all([ _is_numeric(col) for col in result ]):
+            return outf._batch(result, kwargs, size)
+        else:
+            return _batch_loop( \
+                    lambda args, kwargs, memo: outf(*args, **kwargs), \
+                    result, kwargs, size)
+
     def bind(self, outf):
         return ComposerBind(self, outf)
 
 
 class ComposerOr(ComposerFunctionBase):
+    __slots__ = ('left', 'right', '_argset', '_kwargset', '_async')
 
     def __init__(self, left, right):
         self.left = left
         self.right = right if isinstance(right, ComposerBase) \
                 else ComposerValue(right)
+        self._argset = _union(self.left._argset, self.right._argset)
+        self._kwargset = _union(self.left._kwargset, self.right._kwargset)
+        self._async = self.left._async or self.right._async
 
-    def getArgSet(self):
-        return tuple(frozenset(self.left.getArgSet() + \
-                self.right.getArgSet()))
-
-    def getKwargSet(self):
-        return tuple(frozenset(self.left.getKwargSet() + \
-                self.right.getKwargSet()))
+    def __reduce__(self):
+        return (self.__class__, (self.left, self.right))
 
     def apply(self, *args, **kwargs):
-        return ComposerOr(self.left.apply(*args, **kwargs), \
-            self.right.apply(*args, **kwargs))
+        return _apply(self, args, kwargs)
 
     def run(self):
+        if self._async:
+            return self._arun()
+        elif _profiler is None:
+            return _run(self)
         return (self.left.run(), self.right.run())
 
+    async def _arun(self):
+        return tuple(await asyncio.gather(_resolve(self.left.run()), \
+                _resolve(self.right.run())))
+
+    def _compile(self, executor=None, shared=None):
+        if executor is not None:
+            ev = _compile_concurrent((self.left, self.right), executor, shared)
+            return lambda args, kwargs, memo: _pair(*ev(args, kwargs, memo))
+        lev = _compile_arg(self.left, executor, shared)
+        rev = _compile_arg(self.right, executor, shared)
+        return lambda args, kwargs, memo: \
+                _pair(lev(args, kwargs, memo), rev(args, kwargs, memo))
+
+    def _batch(self, columns, kwargs, size):
+        left = self.left._batch(columns, kwargs, size)
+        right = self.right._batch(columns, kwargs, size)
+        if isinstance(left, tuple) or isinstance(right, tuple):
+            return ComposerBase._batch(self, columns, kwargs, size)
+        return (left, right)
+
     def bind(self, outf):
         return ComposerBind(self, outf)
 
 
+# node classes __call__ hands to _evaluate()
+_evaluated = frozenset([ ComposerFunction, ComposerBind, ComposerOr ])
+
+
+ComposerCacheInfo = namedtuple('ComposerCacheInfo',
+        ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class ComposerCache(ComposerFunctionBase):
+    __slots__ = ('comp', 'maxsize', 'cache', 'lock', 'hits', 'misses',
+            '_argset', '_kwargset', '_nargs', '_kwnames', '_async')
+
+    def __init__(self, comp, maxsize=128):
+        self.comp = comp
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._argset = comp._argset
+        self._kwargset = comp._kwargset
+        self._nargs = max(comp._argset) + 1 if comp._argset else 0
+        self._kwnames = frozenset(comp._kwargset)
+        self._async = comp._async
+
+    def __reduce__(self):
+        return (self.__class__, (self.comp, self.maxsize))
+
+    def apply(self, *args, **kwargs):
+        return self.comp.apply(*args, **kwargs)
+
+    def run(self):
+        return self.comp.run()
+
+    def bind(self, outf):
+        return ComposerBind(self, outf)
+
+    def __call__(self, *args, **kwargs):
+
+        # calls which fill every placeholder are not specialisations
+        if len(args) >= self._nargs and \
+                kwargs.keys() >= self._kwnames:
+            return self.comp(*args, **kwargs)
+
+        # typed like lru_cache(typed=True), 1, 1.0 and True are distinct
+        try:
+            key = (args, frozenset(kwargs.items()),
+                    _type_signature(args, kwargs))
+            hash(key)
+        except TypeError:
+            return self.comp(*args, **kwargs)
+
+        with self.lock:
+            func = self.cache.get(key)
+            if func is not None:
+                self.cache[key] = self.cache.pop(key)
+                self.hits += 1
+                return func
+            self.misses += 1
+
+        func = self.comp.apply(*args, **kwargs)
+        if not func._argset and not func._kwargset:
+            return func.run()
+
+        with self.lock:
+            self.cache[key] = func
+            while len(self.cache) > self.maxsize:
+                self.cache.popitem(last=False)
+        return func
+
+    def cache_info(self):
+        with self.lock:
+            return ComposerCacheInfo(self.hits, self.misses,
+                    self.maxsize, len(self.cache))
+
+    def cache_clear(self):
+        with self.lock:
+            self.cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+ComposerAdaptiveInfo = namedtuple('ComposerAdaptiveInfo',
+        ['threshold', 'maxsigs', 'signatures'])
+
+
+def _type_signature(args, kwargs):
+    sig = tuple([ type(arg) for arg in args ])
+    if kwargs:
+        return sig, frozenset([ (key, type(val)) \
+                for key, val in kwargs.items() ])
+    return sig
+
+
+class ComposerAdaptive(ComposerFunctionBase):
+    __slots__ = ('comp', 'threshold', 'maxsigs', 'counts', 'paths', 'lock',
+            '_argset', '_kwargset', '_nargs', '_kwnames', '_async')
+
+    # after threshold calls with the same argument types the flat
+    # evaluator is recorded for them; at most maxsigs type signatures
+    # get one, the others stay on the generic path
+
+    def __init__(self, comp, threshold=8, maxsigs=8):
+        self.comp = comp
+        self.threshold = threshold
+        self.maxsigs = maxsigs
+        self.counts = {}
+        self.paths = {}
+        self.lock = threading.Lock()
+        self._argset = comp._argset
+        self._kwargset = comp._kwargset
+        self._nargs = max(comp._argset) + 1 if comp._argset else 0
+        self._kwnames = frozenset(comp._kwargset)
+        self._async = comp._async
+
+    def __reduce__(self):
+        return (self.__class__, (self.comp, self.threshold, self.maxsigs))
+
+    def apply(self, *args, **kwargs):
+        return self.comp.apply(*args, **kwargs)
+
+    def run(self):
+        return self.comp.run()
+
+    def bind(self, outf):
+        return ComposerBind(self, outf)
+
+    def __call__(self, *args, **kwargs):
+        sig = _type_signature(args, kwargs)
+        path = self.paths.get(sig)
+        if path is not None and _profiler is None:
+            return path(args, kwargs)
+
+        if path is None and len(self.paths) < self.maxsigs:
+            with self.lock:
+                count = self.counts[sig] = self.counts.get(sig, 0) + 1
+            if count >= self.threshold:
+                self._specialise(sig, args, kwargs)
+        return self.comp(*args, **kwargs)
+
+    def _specialise(self, sig, args, kwargs):
+        comp = self.comp
+        generic = lambda args, kwargs: comp(*args, **kwargs)
+        flat = None
+        # composers among the arguments change the shape of the graph
+        if len(args) >= self._nargs and kwargs.keys() >= self._kwnames and \
+                _is_plain(args, kwargs):
+            flat = comp._flat()
+
+        if flat is None:
+            path = generic
+        else:
+            ev, shared = flat
+            path = (lambda args, kwargs: _unwrap(ev(args, kwargs, {}))) \
+                    if shared else \
+                    (lambda args, kwargs: _unwrap(ev(args, kwargs, None)))
+
+        with self.lock:
+            if sig not in self.paths and \
+                    len(self.paths) < self.maxsigs:
+                self.paths[sig] = path
+                self.counts.pop(sig, None)
+
+    def adaptive_info(self):
+        with self.lock:
+            return ComposerAdaptiveInfo(self.threshold, self.maxsigs,
+                    tuple(self.paths))
+
+    def adaptive_clear(self):
+        with self.lock:
+            self.counts.clear()
+            self.paths.clear()
+
+
+# profilers are active per thread, _profiling.profiler is the one of
+# the current thread; _profiler is set while any thread has one, which
+# keeps the fast paths off and the run() methods patched
+_profiling = threading.local()
+_profiler_lock = threading.Lock()
+_profiler = None
+_profiler_count = 0
+_profiler_patched = []
+
+
+def _profiled(run):
+    def _(node, *args, **kwargs):
+        profiler = getattr(_profiling, 'profiler', None)
+        if profiler is None:
+            return run(node, *args, **kwargs)
+        return profiler.run(node, run, *args, **kwargs)
+    return _
+
+ComposerProfileStat = namedtuple('ComposerProfileStat',
+        ['name', 'calls', 'cumtime', 'selftime', 'items'])
+
+
+class ComposerProfiler(object):
+
+    # run() of every node class is replaced while a profiler is active,
+    # so there is no cost at all when profiling is off; a profiler only
+    # sees the thread which entered it, and contexts nest per thread
+
+    def __init__(self, callback=None, timer=time.perf_counter):
+        self.callback = callback
+        self.timer = timer
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.previous = None
+
+    def __enter__(self):
+        global _profiler, _profiler_count
+        with _profiler_lock:
+            if not _profiler_count:
+                for cls in [ ComposerBase ] + \
+                        list(_subclasses(ComposerBase)):
+                    if 'run' in cls.__dict__:
+                        run = cls.__dict__['run']
+                        _profiler_patched.append((cls, run))
+                        setattr(cls, 'run', _profiled(run))
+                _profiler = _profiling
+            _profiler_count += 1
+        self.previous = getattr(_profiling, 'profiler', None)
+        _profiling.profiler = self
+        return self
+
+    def __exit__(self, *exc_info):
+        global _profiler, _profiler_count
+        _profiling.profiler = self.previous
+        with _profiler_lock:
+            _profiler_count -= 1
+            if not _profiler_count:
+                _profiler = None
+                for cls, run in reversed(_profiler_patched):
+                    setattr(cls, 'run', run)
+                del _profiler_patched[:]
+
+    def _stack(self):
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def _record(self, node, elapsed, selftime, calls, items):
+        key = (node.__class__, id(getattr(node, 'func', None)))
+        with self.lock:
+            stat = self.stats.get(key)
+            if stat is None:
+                stat = self.stats[key] = \
+                        [ _profile_name(node), 0, 0.0, 0.0, 0 ]
+            stat[1] += calls
+            stat[2] += elapsed
+            stat[3] += selftime
+            stat[4] += items
+        if self.callback is not None and calls:
+            self.callback(node, elapsed, selftime)
+
+    def _measure(self, node, func, calls, *args, **kwargs):
+        stack = self._stack()
+        stack.append(0.0)
+        start = self.timer()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = self.timer() - start
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self._record(node, elapsed, elapsed - children, calls, 0)
+
+    def run(self, node, run, *args, **kwargs):
+        result = self._measure(node, run, 1, node, *args, **kwargs)
+        if isinstance(node, ComposerIterableBase) and \
+                hasattr(result, '__next__'):
+            return self._iterate(node, result)
+        return result
+
+    def _iterate(self, node, it):
+        # time spent producing each item is added to the stage
+        while True:
+            try:
+                item = self._measure(node, next, 0, it)
+            except StopIteration:
+                return
+            self._record(node, 0.0, 0.0, 0, 1)
+            yield item
+
+    def report(self):
+        with self.lock:
+            stats = [ ComposerProfileStat(*stat) \
+                    for stat in self.stats.values() ]
+        return sorted(stats, key=lambda stat: stat.cumtime, reverse=True)
+
+    def clear(self):
+        with self.lock:
+            self.stats.clear()
+
+
 class ComposerIterableBase(ComposerFunction):
-    pass
+    __slots__ = ()
+
+    def _compile(self, executor=None, shared=None):
+        return ComposerBase._compile(self)
+
+    def _batch(self, columns, kwargs, size):
+        return ComposerBase._batch(self, columns, kwargs, size)
 
 
 class ComposerIterable(ComposerIterableBase):
+    __slots__ = ('it', )
 
     def __init__(self, it):
         self.it = it
+        self._argset = self._kwargset = ()
+        self._async = False
 
-    def getArgSet(self): return ()
-
-    def getKwargSet(self): return ()
+    def __reduce__(self):
+        return (self.__class__, (self.it, ))
 
     def apply(self, *args, **kwargs): return self
 
@@ -372,38 +1916,273 @@ class ComposerIterable(ComposerIterableBase):
 
 
 class ComposerIterableFunction(ComposerIterableBase):
+    __slots__ = ()
 
     def bind(self, func):
         return ComposerIterableBind(self, func)
 
 
 class ComposerIterableBind(ComposerIterableBase):
+    __slots__ = ('it', )
 
     def __init__(self, it, func):
         self.it = it
         self.func = func
+        self._argset = it._argset
+        self._kwargset = _union(it._kwargset, func._kwargset)
+        self._async = func._async and isinstance(func, ComposerIterableBase)
 
-    def getArgSet(self):
-        return self.it.getArgSet()
-
-    def getKwargSet(self):
-        return tuple(frozenset(self.it.getKwargSet() + \
-                self.func.getKwargSet()))
+    def __reduce__(self):
+        return (self.__class__, (self.it, self.func))
 
     def apply(self, *args, **kwargs):
-        return self.__class__( \
-                self.it.apply(*args, **kwargs), \
-                self.func.apply(**kwargs))
+        it = self.it.apply(*args, **kwargs)
+        func = self.func.apply(**kwargs)
+        return self if it is self.it and func is self.func else \
+                self.__class__(it, func)
 
     def run(self):
         if isinstance(self.func, ComposerIterableBase):
             return self.func(*force_tuple(self.it()))
+
+        # the map stages below this one run as one function per item
+        funcs = [ self.func ]
+        node = self.it
+        if _profiler is None and not self.func._async:
+            while node.__class__ is ComposerIterableBind and \
+                    not isinstance(node.func, ComposerIterableBase) and \
+                    not node.func._async:
+                funcs.append(node.func)
+                node = node.it
+        func = _fuse(funcs[::-1]) if len(funcs) > 1 else self.func
+
+        it = node()
+        if hasattr(it, '__aiter__') or self.func._async:
+            return self._amap(it, func)
         else:
-            return (self.func(*force_tuple(args)) for args in self.it())
+            return (func(*force_tuple(args)) for args in it)
+
+    async def _amap(self, it, func=None):
+        func = func or self.func
+        if hasattr(it, '__aiter__'):
+            async for args in it:
+                yield await _resolve(func(*force_tuple(args)))
+        else:
+            for args in it:
+                yield await _resolve(func(*force_tuple(args)))
 
     def bind(self, func):
         return self.__class__(self, func)
 
+    def _stages(self):
+        # the source and the funcs of a chain of plain binds
+        stages = [ self.func ]
+        node = self.it
+        while node.__class__ is ComposerIterableBind:
+            stages.append(node.func)
+            node = node.it
+        stages.reverse()
+        return node, stages
+
+    def parallel(self, chunksize=64, workers=None, executor=None,
+            inflight=None):
+        return ComposerIterableParallelBind(self.it, self.func,
+                chunksize, workers, executor, inflight)
+
+    def pipeline(self, maxsize=16, workers=1):
+        return ComposerIterablePipeline(self.it, self.func, maxsize, workers)
+
+    def sharded(self, workers=None, shards=None, ordered=True,
+            executor=None):
+        return ComposerIterableShardedBind(self.it, self.func, workers,
+                shards, ordered, executor)
+
+
+class ComposerIterableParallelBind(ComposerIterableBind):
+    __slots__ = ('chunksize', 'workers', 'executor', 'inflight')
+
+    def __init__(self, it, func, chunksize=64, workers=None, executor=None,
+            inflight=None):
+        ComposerIterableBind.__init__(self, it, func)
+        self.chunksize = chunksize
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = executor
+        self.inflight = inflight or 2 * self.workers
+
+    def __reduce__(self):
+        # an executor belongs to the process which created it
+        return (self.__class__, (self.it, self.func, self.chunksize,
+            self.workers, None, self.inflight))
+
+    def apply(self, *args, **kwargs):
+        it = self.it.apply(*args, **kwargs)
+        func = self.func.apply(**kwargs)
+        return self if it is self.it and func is self.func else \
+                self.__class__(it, func, self.chunksize, self.workers,
+                        self.executor, self.inflight)
+
+    def run(self):
+        if isinstance(self.func, ComposerIterableBase) or self.func._async:
+            return ComposerIterableBind.run(self)
+
+        it = self.it()
+        if hasattr(it, '__aiter__'):
+            return self._amap(it)
+        return _parallel_map(self.func, it, self.chunksize, self.workers,
+                self.executor, self.inflight)
+
+    def bind(self, func):
+        return ComposerIterableBind(self, func)
+
+
+ComposerPipelineStat = namedtuple('ComposerPipelineStat',
+        ['name', 'items', 'maxsize', 'depth', 'peak'])
+
+
+class ComposerPipelineStats(object):
+
+    # the stats of one run; depth is the mean size of the input queue of
+    # a stage, sampled on every put; the last entry is the queue read by
+    # the consumer
+
+    def __init__(self, stages=(), maxsize=0):
+        self.lock = threading.Lock()
+        self.stages = [ [ name, 0, maxsize, 0, 0, 0 ] for name in \
+                [ _profile_name(func) for func in stages ] + [ 'output' ] ] \
+                if stages else []
+
+    def _put(self, idx, depth):
+        with self.lock:
+            stage = self.stages[idx]
+            stage[3] += depth
+            stage[4] += 1
+            stage[5] = max(stage[5], depth)
+
+    def _item(self, idx):
+        with self.lock:
+            self.stages[idx][1] += 1
+
+    def report(self):
+        with self.lock:
+            return [ ComposerPipelineStat(name, items, maxsize,
+                float(total) / puts if puts else 0.0, peak) \
+                    for name, items, maxsize, total, puts, peak \
+                    in self.stages ]
+
+    def clear(self):
+        with self.lock:
+            del self.stages[:]
+
+
+class ComposerIterablePipeline(ComposerIterableBind):
+    __slots__ = ('maxsize', 'workers', 'last')
+
+    # every stage of the bind chain runs in its own threads, joined by
+    # queues of maxsize items; workers is a count for every stage or
+    # one count per stage
+
+    def __init__(self, it, func, maxsize=16, workers=1, last=None):
+        ComposerIterableBind.__init__(self, it, func)
+        self.maxsize = maxsize
+        self.workers = workers
+        # the stats of the last run, shared with the applied copies
+        self.last = last if last is not None else \
+                [ ComposerPipelineStats() ]
+
+    @property
+    def stats(self):
+        return self.last[0]
+
+    def __reduce__(self):
+        return (self.__class__, (self.it, self.func, self.maxsize,
+            self.workers))
+
+    def apply(self, *args, **kwargs):
+        it = self.it.apply(*args, **kwargs)
+        func = self.func.apply(**kwargs)
+        return self if it is self.it and func is self.func else \
+                self.__class__(it, func, self.maxsize, self.workers,
+                        self.last)
+
+    def run(self):
+        source, stages = self._stages()
+        if self._async or any([ func._async for func in stages ]):
+            return ComposerIterableBind.run(self)
+
+        it = source()
+        if hasattr(it, '__aiter__'):
+            return self._amap(it)
+
+        if isinstance(self.workers, int):
+            workers = [ self.workers ] * len(stages)
+        else:
+            workers = list(self.workers)
+            if len(workers) != len(stages):
+                raise ValueError('%d stages but %d worker counts' % \
+                        (len(stages), len(workers)))
+        for func, count in zip(stages, workers):
+            if count > 1 and isinstance(func, ComposerIterableBase):
+                raise ValueError('%s needs the whole stream' % \
+                        _profile_name(func))
+
+        stats = self.last[0] = ComposerPipelineStats(stages, self.maxsize)
+        return _pipeline(it, stages, self.maxsize, workers, stats)
+
+    def bind(self, func):
+        return self.__class__(ComposerIterableBind(self.it, self.func), func,
+                self.maxsize, self.workers, self.last)
+
+
+class ComposerIterableShardedBind(ComposerIterableBind):
+    __slots__ = ('workers', 'shards', 'ordered', 'executor')
+
+    # the source is split with shard_source() and the whole chain of map
+    # stages runs on every shard in a worker; results are merged in the
+    # order of the source or as the shards finish
+
+    def __init__(self, it, func, workers=None, shards=None, ordered=True,
+            executor=None):
+        ComposerIterableBind.__init__(self, it, func)
+        self.workers = workers or os.cpu_count() or 1
+        self.shards = shards or self.workers
+        self.ordered = ordered
+        self.executor = executor
+
+    def __reduce__(self):
+        # an executor belongs to the process which created it
+        return (self.__class__, (self.it, self.func, self.workers,
+            self.shards, self.ordered))
+
+    def apply(self, *args, **kwargs):
+        it = self.it.apply(*args, **kwargs)
+        func = self.func.apply(**kwargs)
+        return self if it is self.it and func is self.func else \
+                self.__class__(it, func, self.workers, self.shards,
+                        self.ordered, self.executor)
+
+    def run(self):
+        source, stages = self._stages()
+        if any([ func._async or isinstance(func, ComposerIterableBase) \
+                for func in stages ]):
+            return ComposerIterableBind.run(self)
+
+        def chain(it):
+            node = ComposerIterable(it)
+            for func in stages:
+                node = ComposerIterableBind(node, func)
+            return node
+
+        it = source()
+        shards = shard_source(it, self.shards)
+        if shards is None:
+            return chain(it)()
+        return _sharded([ chain(shard) for shard in shards ], self.workers,
+                self.executor, self.ordered)
+
+    def bind(self, func):
+        return self.__class__(ComposerIterableBind(self.it, self.func), func,
+                self.workers, self.shards, self.ordered, self.executor)
+
 
 ########################################################################
 # main
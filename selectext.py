@@ -25,12 +25,17 @@
 # THE SOFTWARE.
 #
 
+import heapq
+import itertools
+import os
 import select
 import socket
 import sys
 import time
 import threading
 
+from collections import deque
+
 
 try:
     from socket import socketpair
@@ -68,116 +73,405 @@ except ImportError:
         return (ssock, csock)
 
 
-class SelectExt(object):
+# timers must not move with the wall clock
+try:
+    monotonic = time.monotonic
+except AttributeError:
+    monotonic = time.time
+
+
+EVENT_READ = 1
+EVENT_WRITE = 2
+EVENT_ERROR = 4 # exceptional condition, e.g. out-of-band data
+
+
+def _fileno(sock):
+    return sock if isinstance(sock, int) else sock.fileno()
+
+
+class SelectBackend(object):
+
+    # select.select() over the registered sockets, limited to FD_SETSIZE
+
+    def __init__(self):
+        self.events = {}
+
+    def register(self, sock, events):
+        self.events[sock] = events
+
+    def modify(self, sock, events):
+        self.events[sock] = events
+
+    def unregister(self, sock):
+        del self.events[sock]
+
+    def poll(self, timeout=None):
+        rlist, wlist, xlist = select.select(
+            [ sock for sock, events in self.events.items() \
+                    if events & EVENT_READ ],
+            [ sock for sock, events in self.events.items() \
+                    if events & EVENT_WRITE ],
+            [ sock for sock, events in self.events.items() \
+                    if events & EVENT_ERROR ],
+            timeout)
+
+        ready = dict([ (sock, EVENT_READ) for sock in rlist ])
+        for sock in wlist:
+            ready[sock] = ready.get(sock, 0) | EVENT_WRITE
+        for sock in xlist:
+            ready[sock] = ready.get(sock, 0) | EVENT_ERROR
+        return list(ready.items())
+
+    def close(self):
+        self.events.clear()
+
+
+class EpollBackend(object):
+
+    # the kernel keeps the interest set, so a wakeup costs O(ready)
+    # and descriptors are not limited to FD_SETSIZE
 
     def __init__(self):
+        self.epoll = select.epoll()
+        self.socks = {}
+        self.events = {}
+
+    def _mask(self, events):
+        return (select.EPOLLIN if events & EVENT_READ else 0) | \
+                (select.EPOLLOUT if events & EVENT_WRITE else 0) | \
+                (select.EPOLLPRI if events & EVENT_ERROR else 0)
+
+    def register(self, sock, events):
+        fd = _fileno(sock)
+        old = self.socks.get(fd)
+        if old is not None:
+            # closed without unregister and the fd was reused
+            self.unregister(old)
+        self.epoll.register(fd, self._mask(events))
+        self.socks[fd] = sock
+        self.events[sock] = (fd, events)
+
+    def modify(self, sock, events):
+        fd = self.events[sock][0]
+        self.epoll.modify(fd, self._mask(events))
+        self.events[sock] = (fd, events)
+
+    def unregister(self, sock):
+        fd, events = self.events.pop(sock, (None, 0))
+        if fd is None or self.socks.get(fd) is not sock:
+            return
+        del self.socks[fd]
+        try:
+            self.epoll.unregister(fd)
+        except (OSError, ValueError):
+            # already closed, the kernel dropped it
+            pass
+
+    def poll(self, timeout=None):
+        ready = []
+        for fd, mask in self.epoll.poll(-1 if timeout is None else timeout):
+            sock = self.socks.get(fd)
+            if sock is None:
+                continue
+            events = self.events[sock][1]
+            ready_events = \
+                    (EVENT_READ if mask & select.EPOLLIN else 0) | \
+                    (EVENT_WRITE if mask & select.EPOLLOUT else 0) | \
+                    (EVENT_ERROR if mask & select.EPOLLPRI else 0)
+            if mask & (select.EPOLLERR | select.EPOLLHUP):
+                # the reader or writer sees the error on its next call
+                ready_events |= events & (EVENT_READ | EVENT_WRITE) or \
+                        EVENT_ERROR
+            ready.append((sock, ready_events & events))
+        return ready
+
+    def close(self):
+        self.epoll.close()
+        self.socks.clear()
+        self.events.clear()
+
+
+DefaultBackend = EpollBackend if hasattr(select, 'epoll') else SelectBackend
+
+
+class Wakeup(object):
+
+    # readable while a wakeup is pending; an eventfd where there is one,
+    # a socketpair elsewhere, both non-blocking
+
+    def __init__(self):
+        if hasattr(os, 'eventfd'):
+            self.fd = os.eventfd(0, os.EFD_NONBLOCK | os.EFD_CLOEXEC)
+            self.pair = None
+        else:
+            self.fd = None
+            self.pair = socketpair()
+            self.pair[0].setblocking(False)
+            self.pair[1].setblocking(False)
+
+    def fileno(self):
+        return self.fd if self.pair is None else self.pair[0].fileno()
+
+    def send(self):
+        try:
+            if self.pair is None:
+                os.eventfd_write(self.fd, 1)
+            else:
+                self.pair[1].send(bytes(b'@'))
+        except (BlockingIOError, socket.error):
+            pass # full, so it is readable anyway
+
+    def drain(self):
+        try:
+            if self.pair is None:
+                os.eventfd_read(self.fd)
+            else:
+                while self.pair[0].recv(4096):
+                    pass
+        except (BlockingIOError, socket.error):
+            pass
+
+    def close(self):
+        if self.pair is None:
+            os.close(self.fd)
+        else:
+            self.pair[0].close()
+            self.pair[1].close()
+
+
+class SelectExt(object):
+
+    def __init__(self, backend=None):
         self.readers = {}
         self.writers = {}
         self.timers = {}
         self.error_handlers = {}
 
+        # [ expire, seq, callback, idx, period, coalesce ] ordered by
+        # expire; unset_timer() clears the callback and the entry is
+        # dropped when it comes up
+        self.timer_heap = []
+        self.timer_seq = itertools.count()
+        self.cancelled = 0
+
         self.rlock = threading.RLock()
         self.notify_lock = threading.Lock()
-        self.pair = socketpair()
         self.cont = True
 
+        # at most one wakeup is pending, woken tells whether it is
+        self.wakeup = Wakeup()
+        self.woken = False
+
+        self.backend = backend if backend is not None else DefaultBackend()
+        self.backend.register(self.wakeup, EVENT_READ)
+        self.interest = {}
+
+        # the thread in wait() and the changes queued for it; rlock is
+        # held only to apply changes, never across the select
+        self.loop = None
+        self.pending = deque()
+
     def __del__(self):
-        self.pair[0].shutdown(socket.SHUT_RDWR)
-        self.pair[1].shutdown(socket.SHUT_RDWR)
-        self.pair[0].close()
-        self.pair[1].close()
+        self.backend.close()
+        self.wakeup.close()
 
-    def set_reader(self, sock, callback):
-        with self.rlock:
-            self.readers[sock] = callback
+    def _wake(self):
+        # the loop thread sees every change before it selects again
+        if self.loop is threading.current_thread():
+            return
+        with self.notify_lock:
+            if self.woken:
+                return
+            self.woken = True
+        self.wakeup.send()
+
+    def _update(self, sock):
+        # keep the backend registration in line with the callbacks
+        events = (EVENT_READ if sock in self.readers else 0) | \
+                (EVENT_WRITE if sock in self.writers else 0) | \
+                (EVENT_ERROR if sock in self.error_handlers else 0)
+        current = self.interest.get(sock, 0)
+        if events == current:
+            return
+        if not events:
+            del self.interest[sock]
+            self.backend.unregister(sock)
+        else:
+            self.interest[sock] = events
+            if current:
+                self.backend.modify(sock, events)
+            else:
+                self.backend.register(sock, events)
 
-    def set_writer(self, sock, callback):
+    def _call(self, func, *args):
+        # while another thread is in wait() the change is queued for it,
+        # otherwise it is made right away
         with self.rlock:
-            self.writers[sock] = callback
+            queued = self.loop is not None and \
+                    self.loop != threading.current_thread()
+            if queued:
+                self.pending.append((func, args))
+            else:
+                func(*args)
+        if queued:
+            self._wake()
 
-    def set_timer(self, timeout, callback):
-        with self.rlock:
-            idx = object()
-            self.timers[idx] = (time.time() + timeout, callback)
+    def _set(self, handlers, sock, callback):
+        handlers[sock] = callback
+        self._update(sock)
 
-            self.cont = True
-            self.pair[1].send(bytes(b'@'))
+    def _unset(self, handlers, sock):
+        if sock in handlers:
+            del handlers[sock]
+            self._update(sock)
 
-            return idx
+    def set_reader(self, sock, callback):
+        self._call(self._set, self.readers, sock, callback)
+
+    def set_writer(self, sock, callback):
+        self._call(self._set, self.writers, sock, callback)
+
+    def set_timer(self, timeout, callback):
+        idx = object()
+        self._call(self._add_timer, idx, monotonic() + timeout, callback,
+                None, False)
+        return idx
+
+    def set_interval(self, period, callback, coalesce=False):
+        # fires at fixed multiples of period from now, however long the
+        # callbacks take; with coalesce the ticks missed while the loop
+        # was busy give a single call, otherwise each of them is called
+        if period <= 0:
+            raise ValueError('period must be positive')
+        idx = object()
+        self._call(self._add_timer, idx, monotonic() + period, callback,
+                period, coalesce)
+        return idx
+
+    def _add_timer(self, idx, expire, callback, period, coalesce):
+        entry = [ expire, next(self.timer_seq), callback, idx, period,
+                coalesce ]
+        self._push_timer(entry)
+        self.timers[idx] = entry
+
+    def _push_timer(self, entry):
+        # only the loop thread or a thread outside of wait() gets here,
+        # and either way the next select uses the new timeout
+        heapq.heappush(self.timer_heap, entry)
 
     def set_error_handler(self, sock, callback):
-        with self.rlock:
-            self.error_handlers[sock] = callback
+        self._call(self._set, self.error_handlers, sock, callback)
 
     def unset_reader(self, sock):
-        with self.rlock:
-            if sock in self.readers:
-                del self.readers[sock]
+        self._call(self._unset, self.readers, sock)
 
     def unset_writer(self, sock):
-        with self.rlock:
-            if sock in self.writers:
-                del self.writers[sock]
+        self._call(self._unset, self.writers, sock)
 
     def unset_timer(self, idx):
-        with self.rlock:
-            if idx in self.timers:
-                del self.timers[idx]
-
-            self.cont = True
-            self.pair[1].send(bytes(b'@'))
+        self._call(self._unset_timer, idx)
+
+    def _unset_timer(self, idx):
+        entry = self.timers.pop(idx, None)
+        if entry is None:
+            return
+        entry[2] = None
+        if entry[0] is not None:
+            self.cancelled += 1
+
+        # rebuild once most of the heap is cancelled entries
+        if self.cancelled > 64 and \
+                self.cancelled * 2 > len(self.timer_heap):
+            self.timer_heap = [ entry for entry in self.timer_heap \
+                    if entry[2] is not None ]
+            heapq.heapify(self.timer_heap)
+            self.cancelled = 0
 
     def unset_error_handler(self, sock):
-        with self.rlock:
-            if sock in self.error_handlers:
-                del self.error_handlers[sock]
+        self._call(self._unset, self.error_handlers, sock)
+
+    def _apply_pending(self):
+        while self.pending:
+            func, args = self.pending.popleft()
+            func(*args)
 
     def notify(self):
         with self.notify_lock:
             self.cont = False
-            self.pair[1].send(bytes(b'@'))
+        self._wake()
           
     def wait(self):
 
         with self.rlock:
+            self.loop = threading.current_thread()
+            self._apply_pending()
 
-            if self.timers:
+            heap = self.timer_heap
+            while heap and heap[0][2] is None:
+                heapq.heappop(heap)
+                self.cancelled -= 1
 
-                now = time.time()
-                timeout = max(min([ expire for expire, callback in \
-                    self.timers.values() ] + [now]) - now, 0)
+            timeout = max(heap[0][0] - monotonic(), 0) if heap else None
 
-                ready_to_read, ready_to_write, in_error = select.select(
-                    list(self.readers.keys()) + [ self.pair[0], ],
-                    self.writers.keys(),
-                    self.error_handlers.keys(),
-                    timeout)
-            else:
-                ready_to_read, ready_to_write, in_error = select.select(
-                    list(self.readers.keys()) + [ self.pair[0], ],
-                    self.writers.keys(),
-                    self.error_handlers.keys())
-    
-            for sock in ready_to_read:
-                if sock != self.pair[0]:
-                    self.readers[sock]()
-            for sock in ready_to_write:
+        try:
+            return self._dispatch(self.backend.poll(timeout))
+        finally:
+            with self.rlock:
+                self.loop = None
+                self._apply_pending()
+
+    def _dispatch(self, ready):
+        ready_to_read = [ sock for sock, events in ready \
+                if events & EVENT_READ ]
+
+        # a callback may unset a socket which is also ready
+        for sock in ready_to_read:
+            if sock is not self.wakeup and sock in self.readers:
+                self.readers[sock]()
+        for sock, events in ready:
+            if events & EVENT_WRITE and sock in self.writers:
                 self.writers[sock]()
-            for sock in in_error:
+        for sock, events in ready:
+            if events & EVENT_ERROR and sock in self.error_handlers:
                 self.error_handlers[sock]()
 
-            now = time.time()
-            for idx in [ idx for idx in self.timers.keys() \
-                    if now > self.timers[idx][0] ]:
-                self.timers[idx][1]()
+        # timers set by the callbacks wait for the next round
+        now = monotonic()
+        heap = self.timer_heap
+        expired = []
+        while heap and heap[0][0] <= now:
+            entry = heapq.heappop(heap)
+            if entry[2] is None:
+                self.cancelled -= 1
+            else:
+                expired.append((entry[0], entry))
+                entry[0] = None # out of the heap
+        for expire, entry in expired:
+            # another callback may have unset it
+            if entry[2] is None:
+                continue
+            seq, callback, idx, period, coalesce = entry[1:]
+            if period is None:
                 del self.timers[idx]
-
-            if self.pair[0] in ready_to_read:
-                # TODO: any better way to clear the socket completely ?
-                self.pair[0].recv(4096)
-                return self.cont
             else:
-                return True
+                # the next tick counts from the due time, not from now
+                expire += period
+                if coalesce and expire <= now:
+                    expire += period * (int((now - expire) // period) + 1)
+                entry[0] = expire
+                entry[1] = next(self.timer_seq)
+                self._push_timer(entry)
+            callback()
+
+        if self.wakeup in ready_to_read:
+            self.wakeup.drain()
+        with self.notify_lock:
+            if self.wakeup in ready_to_read:
+                self.woken = False
+            # a notify() stops one loop, the next wait() starts afresh
+            cont = self.cont
+            self.cont = True
+        return cont
 
 ########################################################################
 # main
@@ -1,13 +1,23 @@
 #!/usr/bin/env python
 #
 
+import asyncio
+import datetime
+import functools
+import inspect
 import operator
 import os
+import pickle
 import sys
+import threading
+import time
 import unittest
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from composer import *
+import composer as composer_module
 
 
 
@@ -149,6 +159,32 @@ class ComposerBuiltinTest(unittest.TestCase):
         self.assertEqual(func(), 20)
 
 
+    def test_signature(self):
+        self.assertEqual(composer(pow)(2)(3, 5), 8)
+        self.assertEqual(composer(divmod)(7, 2), (3, 1))
+        self.assertEqual(composer(max)(3, 5), 5)
+        self.assertEqual(composer([1].index)(1), 0)
+        self.assertEqual(composer(int.from_bytes)(b'\x01', \
+                byteorder='big'), 1)
+
+        with self.assertRaises(TypeError):
+            composer(operator.add)(1, 'a')
+
+        self.assertEqual(get_builtin_signature(operator.add),
+                ((('a', inspect.Parameter.POSITIONAL_ONLY),
+                    ('b', inspect.Parameter.POSITIONAL_ONLY)), ()))
+        self.assertIs(get_builtin_signature(max), None)
+
+    def test_classmethod_signature(self):
+        # same name, same metaclass, different signatures
+        self.assertEqual(get_builtin_signature(datetime.date.fromtimestamp),
+                ((('timestamp', inspect.Parameter.POSITIONAL_ONLY), ), ()))
+        self.assertIs(get_builtin_signature(datetime.datetime.fromtimestamp),
+                None)
+        self.assertEqual(get_builtin_signature(dict.fromkeys),
+                ((('iterable', inspect.Parameter.POSITIONAL_ONLY), ), ()))
+
+
 class ComposerFunctionBind(unittest.TestCase):
 
     def test_bind_1(self):
@@ -251,6 +287,81 @@ class ComposerFunctionBind(unittest.TestCase):
         self.assertEqual(func(20)(10), (60, 20))
 
 
+class ComposerSignatureTest(unittest.TestCase):
+
+    def test_defaults(self):
+        def calc(a, b, c=1, *args, **kwargs):
+            return a + b + c
+        func = composer(calc)
+        self.assertEqual(func.argset, (0, 1))
+        self.assertEqual(func(1)(2), 4)
+
+    def test_kwonly(self):
+        def calc(a, *, b, c=1):
+            return a - b + c
+        func = composer(calc)
+        self.assertEqual(func.argset, (0,))
+        self.assertEqual(func.kwargset, ('b',))
+        self.assertEqual(func(10)(b=3), 8)
+        self.assertEqual(get_signature(calc), (1, ('b',)))
+
+    def test_bound_method(self):
+        class Calc(object):
+            def __init__(self, base):
+                self.base = base
+            def add(self, a, b=0):
+                return self.base + a + b
+        self.assertEqual(composer(Calc(10).add)(1), 11)
+        self.assertEqual(get_nargs(Calc(10).add), 1)
+        self.assertEqual(get_nargs(Calc.add), 2)
+
+    def test_cache(self):
+        def make(base):
+            def add(a, b):
+                return base + a + b
+            return add
+        get_signature(make(1))
+        self.assertIn((make(2).__code__, False), composer_module._signatures)
+
+    def test_wrapped(self):
+        def calc(a, b):
+            return a - b
+
+        @functools.wraps(calc)
+        def wrapper(*args, **kwargs):
+            return calc(*args, **kwargs)
+
+        self.assertEqual(composer(wrapper).argset, (0, 1))
+        self.assertEqual(composer(wrapper)(3)(1), 2)
+
+    def test_partial(self):
+        func = composer(functools.partial(operator.sub, 10))
+        self.assertEqual(func.argset, (0, ))
+        self.assertEqual(func(3), 7)
+
+        def calc(a, b, *, c):
+            return a - b + c
+        func = composer(functools.partial(calc, 10))
+        self.assertEqual(func.argset, (0, ))
+        self.assertEqual(func.kwargset, ('c', ))
+        self.assertEqual(func(3)(c=1), 8)
+
+    def test_callable_object(self):
+        class Scale(object):
+            def __init__(self, factor):
+                self.factor = factor
+            def __call__(self, a, b=1):
+                return a * b * self.factor
+        func = composer(Scale(2))
+        self.assertEqual(func.argset, (0, ))
+        self.assertEqual(func(3), 6)
+        self.assertIn((Scale.__call__.__code__, True),
+                composer_module._signatures)
+        self.assertEqual(composer(Scale).argset, (0, ))
+        self.assertEqual(composer(Scale)(3)(4), 12)
+        self.assertEqual(composer(dict)(), {})
+
+
 class ComposerOr(unittest.TestCase):
 
     def test_1(self):
@@ -372,6 +483,1145 @@ class ComposerIterableFunctionTest(unittest.TestCase):
         self.assertEqual(tuple(list(func(10))), (10,12,14,16,18))
 
 
+class ComposerIndexTest(unittest.TestCase):
+
+    def test_deep_chain(self):
+        _0 = composer(0)
+        _a = composer('a')
+        add = composer(operator.add, _0, _a)
+        func = add
+        for _ in range(200):
+            func = func >> add
+        self.assertEqual(func.argset, (0,))
+        self.assertEqual(func.kwargset, ('a',))
+        self.assertEqual(func(0, a=1), 201)
+
+    def test_partial_shares_nodes(self):
+        _0 = composer(0)
+        _a = composer('a')
+        _b = composer('b')
+        left = composer(operator.add, _0, _a)
+        right = composer(operator.sub, _0, _b)
+        func = left >> right
+
+        partial = func(a=1)
+        self.assertIsNot(partial.inf, left)
+        self.assertIs(partial.outf, right)
+        self.assertEqual(partial.kwargset, ('b',))
+        self.assertIs(partial(c=1), partial)
+
+        func = left | right
+        partial = func(b=1)
+        self.assertIs(partial.left, left)
+        self.assertEqual(partial(10, a=1), (11, 9))
+
+    def test_builtin_immutable(self):
+        add = composer(operator.add)
+        partial = add(1, x=None)
+        self.assertEqual(add.kwargs, {})
+        self.assertEqual(partial.kwargs, {'x': None})
+
+
+class ComposerCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        _0 = composer(0)
+        _add_val = composer('add_val')
+        _sub_val = composer('sub_val')
+        self.func_comp = (composer(operator.add, _0, _add_val) >> \
+                composer(operator.sub, _0, _sub_val)).cached(maxsize=2)
+
+    def test_hit(self):
+        func1 = self.func_comp(add_val=3, sub_val=10)
+        func2 = self.func_comp(sub_val=10, add_val=3)
+        self.assertIs(func1, func2)
+        self.assertEqual(func1(20), 13)
+        self.assertEqual(self.func_comp.cache_info(), (1, 1, 2, 1))
+
+    def test_lru(self):
+        func1 = self.func_comp(add_val=1, sub_val=10)
+        self.func_comp(add_val=2, sub_val=10)
+        self.func_comp(add_val=1, sub_val=10)
+        self.func_comp(add_val=3, sub_val=10)
+        self.assertIs(self.func_comp(add_val=1, sub_val=10), func1)
+        self.assertEqual(self.func_comp.cache_info(), (2, 3, 2, 2))
+        self.assertEqual(self.func_comp(add_val=13, sub_val=10)(20), 23)
+
+    def test_typed(self):
+        func1 = self.func_comp(add_val=1, sub_val=10)
+        func2 = self.func_comp(add_val=1.0, sub_val=10)
+        func3 = self.func_comp(add_val=True, sub_val=10)
+        self.assertIsNot(func1, func2)
+        self.assertIsNot(func2, func3)
+        self.assertEqual(type(func2(20)), float)
+        self.assertEqual(self.func_comp.cache_info(), (0, 3, 2, 2))
+
+    def test_not_cached(self):
+        self.assertEqual(self.func_comp(20, add_val=3, sub_val=10), 13)
+        self.func_comp(add_val=[], sub_val=10)
+        self.assertEqual(self.func_comp.cache_info(), (0, 0, 2, 0))
+
+        self.func_comp.cache_clear()
+        self.assertEqual(self.func_comp.cache_info().currsize, 0)
+
+    def test_bind(self):
+        func = self.func_comp >> composer(operator.mul, composer(0), 2)
+        self.assertEqual(func(20, add_val=3, sub_val=10), 26)
+
+
+class ComposerAdaptiveTest(unittest.TestCase):
+
+    def setUp(self):
+        _0 = composer(0)
+        self.func = composer(operator.add, _0, 1) >> \
+                composer(operator.mul, _0, composer('k'))
+
+    def test_specialise(self):
+        func = self.func.adaptive(threshold=3)
+        for x in range(3):
+            self.assertEqual(func(x, k=2), (x + 1) * 2)
+        self.assertEqual(func.adaptive_info().signatures,
+                (((int, ), frozenset([ ('k', int) ])), ))
+        self.assertEqual(func(5, k=3), 18)
+        self.assertEqual(func(1.5, k=2), 5.0)
+        self.assertEqual(len(func.adaptive_info().signatures), 1)
+        func.adaptive_clear()
+        self.assertEqual(func.adaptive_info().signatures, ())
+
+    def test_guard(self):
+        func = self.func.adaptive(threshold=1)
+        self.assertEqual(func(1, k=2), 4)
+        # different shapes take the generic path
+        partial = func(1)
+        self.assertIsInstance(partial, ComposerBase)
+        self.assertEqual(partial(k=5), 10)
+        partial = func(composer(0), k=2)
+        self.assertEqual(partial(4), 10)
+        self.assertEqual(func(1, k=2), 4)
+        self.assertEqual(len(func.adaptive_info().signatures), 3)
+
+    def test_maxsigs(self):
+        func = self.func.adaptive(threshold=1, maxsigs=2)
+        for val in [ 1, 1.0, True, 1, 1.0 ]:
+            self.assertEqual(func(val, k=2), 4)
+        self.assertEqual(func.adaptive_info().signatures,
+                (((int, ), frozenset([ ('k', int) ])),
+                    ((float, ), frozenset([ ('k', int) ]))))
+        self.assertEqual(func.counts, {})
+
+    def test_compose(self):
+        func = composer(operator.add, composer(0), 1).adaptive(threshold=1)
+        func = func >> composer(operator.neg, composer(0))
+        self.assertEqual([ func(x) for x in range(3) ], [ -1, -2, -3 ])
+        func = pickle.loads(pickle.dumps(self.func.adaptive()))
+        self.assertEqual(func(1, k=3), 6)
+
+    def test_profiler(self):
+        func = composer(operator.add, composer(0), 1).adaptive(threshold=1)
+        func(1)
+        with ComposerProfiler() as profiler:
+            self.assertEqual(func(1), 2)
+        self.assertEqual(profiler.report()[0].calls, 1)
+
+
+class ComposerCompileTest(unittest.TestCase):
+
+    def test_readme(self):
+        _0 = composer(0)
+        _add_val = composer('add_val')
+        _sub_val = composer('sub_val')
+        func_comp = \
+                composer(operator.add, _0, _add_val) >> \
+                composer(operator.sub, _0, _sub_val)
+
+        func = func_comp.compile()
+        self.assertEqual(func(20, add_val=3, sub_val=10), 13)
+        self.assertEqual(func(20, add_val=13, sub_val=10), 23)
+
+        func = func_comp(add_val=3, sub_val=10).compile()
+        self.assertEqual(func(20), 13)
+
+    def test_or(self):
+        _0 = composer(0)
+        _1 = composer(1)
+        func = (composer(operator.add, _0, _1) | \
+                composer(operator.sub, _0, _1)) >> \
+                (composer(operator.mul, _0, _1) | 20) >> \
+                composer(operator.add, _0, _1)
+        self.assertEqual(func.compile()(10, 5), func(10, 5))
+
+    def test_nested(self):
+        _0 = composer(0)
+        add1 = composer(operator.add, _0, 1)
+        func = composer(operator.mul, add1, composer(operator.add, _0, _0))
+        self.assertEqual(func.compile()(3), 24)
+
+    def test_builtin(self):
+        func = composer(operator.add)(1) >> composer(operator.sub)(100)
+        self.assertEqual(func.compile()(1), 98)
+
+    def test_partial(self):
+        _0 = composer(0)
+        _1 = composer(1)
+        func = composer(operator.sub, _1, _0).compile()
+        self.assertEqual(func(1, 10), 9)
+        self.assertEqual(func(1)(10), 9)
+
+        _a1 = composer('a1')
+        func = composer(operator.sub, _a1, _0).compile()
+        self.assertEqual(func(1)(a1=10), 9)
+
+    def test_composer_arg(self):
+        _0 = composer(0)
+        _1 = composer(1)
+        comp = composer(operator.add, _0, 1)
+
+        def do(func, arg):
+            return (func, arg)
+        func = composer(do, _0, _1).compile()
+        self.assertEqual(func(comp, 3)(3), (4, 3))
+
+    def test_nested_partial(self):
+        # a nested short result leaves the graph partially applied, as
+        # calling it does
+        _1 = composer(1)
+        _2 = composer(2)
+        t1 = lambda a: ('u', a)
+        t2 = lambda a, b: (a, b)
+        inner = composer(t2, _1, _1) >> composer(t1, _2)
+        for func in [ composer(t1, inner),
+                composer(t1, inner) | composer(t1, _1),
+                composer(t1, inner) >> composer(t1, composer(0)),
+                composer(t2, inner, inner) ]:
+            expected = func(2, 0)(2, 9)
+            self.assertEqual(func.compile()(2, 0)(2, 9), expected)
+            adaptive = func.adaptive(threshold=1)
+            adaptive(2, 0)
+            self.assertEqual(adaptive(2, 0)(2, 9), expected)
+        self.assertEqual(expected, (('u', 2), ('u', 2)))
+
+    def test_fused_partial(self):
+        _0 = composer(0)
+        stage = composer(operator.neg, _0) >> \
+                composer(operator.add, _0, composer(1))
+        func = composer([ 1, 2 ]) >> composer(lambda x: x, stage) >> \
+                composer(lambda f: f, _0)
+        self.assertEqual([ partial(10) for partial in func() ], [ 9, 8 ])
+
+
+class ComposerConcurrentTest(unittest.TestCase):
+
+    def test_thread(self):
+        _0 = composer(0)
+        _1 = composer(1)
+
+        def slow(x):
+            time.sleep(0.2)
+            return x, threading.current_thread()
+
+        func = composer(slow, _0) | composer(slow, _1) | composer(slow, _0)
+        with ThreadPoolExecutor(4) as executor:
+            started = time.time()
+            ((first, second), third) = func.compile(executor)(1, 2)
+            self.assertTrue(time.time() - started < 0.35)
+        self.assertEqual((first[0], second[0], third[0]), (1, 2, 1))
+        self.assertEqual(len(set([first[1], second[1], third[1]])), 3)
+
+    def test_small_pool(self):
+        _0 = composer(0)
+        func = composer(operator.neg, _0)
+        for _ in range(4):
+            func = composer(operator.add, func, (func | func) >> \
+                    composer(operator.sub, _0, composer(1)))
+        with ThreadPoolExecutor(1) as executor:
+            self.assertEqual(func.compile(executor)(3), func(3))
+
+    def test_function_args(self):
+        _0 = composer(0)
+        func = composer(operator.add, composer(operator.mul, _0, 2), \
+                composer(operator.sub, _0, 1))
+        with ThreadPoolExecutor(2) as executor:
+            self.assertEqual(func.compile(executor)(5), 14)
+
+    def test_process(self):
+        _0 = composer(0)
+        func = composer(operator.add, composer(operator.mul, _0, 2), \
+                composer(operator.sub, _0, 1)) | composer(operator.neg, _0)
+        with ProcessPoolExecutor(2) as executor:
+            self.assertEqual(func.compile(executor)(5), (14, -5))
+
+
+class ComposerAsyncTest(unittest.TestCase):
+
+    def test_bind(self):
+        _0 = composer(0)
+        _a = composer('a')
+
+        async def add(x, y):
+            await asyncio.sleep(0)
+            return x + y
+
+        func = composer(add, _0, _a) >> composer(operator.mul, _0, 2) >> \
+                composer(add, _0, 1)
+        self.assertEqual(asyncio.run(func(1, a=2)), 7)
+        self.assertEqual(asyncio.run(func(a=2)(1)), 7)
+        self.assertEqual(asyncio.run(func.compile()(1, a=2)), 7)
+
+    def test_or(self):
+        _0 = composer(0)
+        _1 = composer(1)
+
+        async def slow(x):
+            await asyncio.sleep(0.2)
+            return x
+
+        func = (composer(slow, _0) | composer(slow, _1) | \
+                composer(operator.neg, _0)) >> \
+                composer(lambda x, y: x + (y,), _0, _1)
+
+        async def run():
+            started = time.time()
+            result = await func(1, 2)
+            return result, time.time() - started
+
+        result, elapsed = asyncio.run(run())
+        self.assertEqual(result, (1, 2, -1))
+        self.assertTrue(elapsed < 0.35)
+
+    def test_nested(self):
+        _0 = composer(0)
+
+        async def double(x):
+            return x * 2
+
+        func = composer(operator.add, composer(double, _0), \
+                composer(double, composer(operator.add, _0, 1)))
+        partial = func()
+        self.assertEqual(asyncio.run(func(1)), 6)
+        self.assertEqual(asyncio.run(partial(1)), 6)
+        self.assertEqual(asyncio.run(partial(2)), 10)
+
+    def test_async_generator(self):
+        _0 = composer(0)
+
+        async def gen(n):
+            for i in range(n):
+                await asyncio.sleep(0)
+                yield i
+
+        async def double(x):
+            return x * 2
+
+        async def collect(it):
+            return [ x async for x in it ]
+
+        func = composer(gen, _0) >> composer(operator.add, _0, 10)
+        self.assertEqual(asyncio.run(collect(func(3))), [ 10, 11, 12 ])
+
+        func = composer(range(3)) >> composer(double, _0)
+        self.assertEqual(asyncio.run(collect(func())), [ 0, 2, 4 ])
+
+
+class ComposerIterableFuseTest(unittest.TestCase):
+
+    def test_fuse(self):
+        _0 = composer(0)
+        _1 = composer(1)
+        func = composer([ (1, 2), (3, 4) ]) >> \
+                (composer(operator.add, _0, _1) | \
+                composer(operator.sub, _0, _1)) >> \
+                composer(operator.mul, _0, _1) >> \
+                composer(operator.add, _0, composer('a'))
+        self.assertEqual(list(func(a=1)), [ -2, -6 ])
+
+    def test_iterable_stage(self):
+        _0 = composer(0)
+
+        def twice(it):
+            for x in it:
+                yield x
+                yield x
+
+        func = composer(range(3)) >> composer(operator.add, _0, 1) >> \
+                ComposerIterableFunction(twice, _0) >> \
+                composer(operator.neg, _0) >> composer(str, _0)
+        self.assertEqual(list(func()), [ '-1', '-1', '-2', '-2', '-3', '-3' ])
+
+    def test_lazy(self):
+        _0 = composer(0)
+        consumed = []
+
+        def source():
+            for i in range(10):
+                consumed.append(i)
+                yield i
+
+        func = ComposerIterableFunction(source) >> \
+                composer(operator.add, _0, 1) >> composer(operator.neg, _0)
+        it = func()
+        self.assertEqual(next(it), -1)
+        self.assertEqual(consumed, [ 0 ])
+
+    def test_async_source(self):
+        _0 = composer(0)
+
+        async def source():
+            for i in range(3):
+                yield i
+
+        func = ComposerIterableFunction(source) >> \
+                composer(operator.add, _0, 1) >> composer(operator.neg, _0)
+
+        async def collect():
+            return [ x async for x in func() ]
+
+        self.assertEqual(asyncio.run(collect()), [ -1, -2, -3 ])
+
+    def test_profiler(self):
+        _0 = composer(0)
+        func = composer(range(3)) >> composer(operator.add, _0, 1) >> \
+                composer(operator.neg, _0)
+        with ComposerProfiler() as profiler:
+            self.assertEqual(list(func()), [ -1, -2, -3 ])
+        names = [ stat.name for stat in profiler.report() ]
+        self.assertIn('ComposerIterableBind(ComposerFunction(add))', names)
+
+
+class ComposerIterableParallelTest(unittest.TestCase):
+
+    def test_thread(self):
+        _0 = composer(0)
+        consumed = []
+
+        def source(n):
+            for i in range(n):
+                consumed.append(i)
+                yield i
+
+        def slow(x):
+            time.sleep(0.001 * (x % 3))
+            return x * 2
+
+        with ThreadPoolExecutor(4) as executor:
+            func = (ComposerIterableFunction(source, _0) >> \
+                    composer(slow, _0)).parallel(chunksize=4, \
+                    executor=executor, inflight=2)
+            it = func(100)
+            self.assertEqual(next(it), 0)
+            self.assertEqual(len(consumed), 8)
+            self.assertEqual(list(it), [ x * 2 for x in range(1, 100) ])
+
+            func = func >> composer(operator.add, _0, 1)
+            self.assertEqual(list(func(10)), [ x * 2 + 1 for x in range(10) ])
+
+    def test_process(self):
+        _0 = composer(0)
+        _a = composer('a')
+        func = (composer(range(1000)) >> \
+                composer(operator.add, _0, _a)).parallel(workers=2)
+        self.assertEqual(list(func(a=1)), list(range(1, 1001)))
+
+
+class ComposerIterablePipelineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.threads = set()
+
+        def slow(x):
+            self.threads.add(threading.current_thread().name)
+            time.sleep(0.001 * (x % 3))
+            return x
+
+        self.slow = slow
+
+    def test_pipeline(self):
+        _0 = composer(0)
+        func = (composer(range(50)) >> composer(self.slow, _0) >> \
+                composer(operator.add, _0, composer('a')) >> \
+                composer(self.slow, _0)).pipeline(maxsize=2)
+        self.assertEqual(list(func(a=1)), list(range(1, 51)))
+        self.assertEqual(len(self.threads), 2)
+        self.assertNotIn(threading.current_thread().name, self.threads)
+
+        stats = func.stats.report()
+        self.assertEqual([ stat.name for stat in stats ],
+                [ 'ComposerFunction(%s)' % self.slow.__qualname__,
+                    'ComposerFunction(add)',
+                    'ComposerFunction(%s)' % self.slow.__qualname__,
+                    'output' ])
+        self.assertEqual([ stat.items for stat in stats ], [ 50 ] * 4)
+        self.assertTrue(all([ stat.peak <= 2 for stat in stats ]))
+
+    def test_stats_per_run(self):
+        _0 = composer(0)
+        func = (ComposerIterableFunction(range, _0) >> \
+                composer(operator.neg, _0)).pipeline()
+        self.assertEqual(func.stats.report(), [])
+        self.assertEqual(list(func(5)), [ 0, -1, -2, -3, -4 ])
+        self.assertEqual(list(func(5)), [ 0, -1, -2, -3, -4 ])
+        self.assertEqual([ stat.items for stat in func.stats.report() ],
+                [ 5, 5 ])
+
+        # runs in progress together keep their own counts
+        first = func(3)
+        second = func(7)
+        self.assertEqual(next(first), 0)
+        stats = func.stats
+        self.assertEqual(list(second), [ -x for x in range(7) ])
+        self.assertEqual(list(first), [ -1, -2 ])
+        self.assertEqual([ stat.items for stat in stats.report() ],
+                [ 7, 7 ])
+
+    def test_workers(self):
+        _0 = composer(0)
+        func = (composer(range(100)) >> composer(self.slow, _0) >> \
+                composer(operator.neg, _0)).pipeline(workers=[ 4, 1 ])
+        self.assertEqual(list(func()), [ -x for x in range(100) ])
+        self.assertEqual(len(self.threads), 4)
+
+    def test_bind(self):
+        _0 = composer(0)
+
+        def pairs(it):
+            it = iter(it)
+            for x in it:
+                yield x + next(it)
+
+        func = (ComposerIterableFunction(range, _0) >> \
+                composer(operator.mul, _0, 2)).pipeline() >> \
+                ComposerIterableFunction(pairs, _0) >> \
+                composer(str, _0)
+        self.assertIsInstance(func, ComposerIterablePipeline)
+        self.assertEqual(list(func(6)), [ '2', '10', '18' ])
+        self.assertEqual(len(func.stats.report()), 4)
+
+    def test_backpressure(self):
+        _0 = composer(0)
+        consumed = []
+
+        def source():
+            for i in range(1000):
+                consumed.append(i)
+                yield i
+
+        func = (ComposerIterableFunction(source) >> \
+                composer(operator.neg, _0)).pipeline(maxsize=3)
+        it = func()
+        self.assertEqual(next(it), 0)
+        time.sleep(0.05)
+        # two queues and one item in the hands of each thread
+        self.assertTrue(len(consumed) <= 10)
+        it.close()
+        self.assertTrue(len(consumed) <= 11)
+
+    def test_error(self):
+        _0 = composer(0)
+        count = threading.active_count()
+
+        def fail(x):
+            if x == 7:
+                raise KeyError(x)
+            return x
+
+        func = (composer(range(100)) >> composer(fail, _0) >> \
+                composer(self.slow, _0)).pipeline()
+        self.assertRaises(KeyError, list, func())
+        self.assertEqual(threading.active_count(), count)
+
+    def test_invalid(self):
+        _0 = composer(0)
+        func = (composer(range(10)) >> composer(operator.neg, _0) >> \
+                composer(operator.neg, _0)).pipeline(workers=[ 2 ])
+        self.assertRaises(ValueError, func)
+
+
+class ComposerIterableShardedTest(unittest.TestCase):
+
+    def test_shard_source(self):
+        self.assertEqual(shard_source([ 1, 2, 3, 4, 5 ], 2),
+                [ [ 1, 2 ], [ 3, 4, 5 ] ])
+        self.assertEqual(shard_source(range(2), 4), [ range(0, 1),
+            range(1, 2) ])
+        self.assertEqual(shard_source((), 4), [ () ])
+        self.assertEqual(shard_source(iter([ 1 ]), 4), None)
+
+    def test_process(self):
+        _0 = composer(0)
+        func = (composer(range(1000)) >> \
+                composer(operator.add, _0, composer('a')) >> \
+                composer(operator.mul, _0, 2)).sharded(workers=2)
+        self.assertEqual(list(func(a=1)), [ (x + 1) * 2 for x in range(1000) ])
+
+    def test_unordered(self):
+        _0 = composer(0)
+        with ThreadPoolExecutor(4) as executor:
+            func = (composer(list(range(100))) >> \
+                    composer(operator.neg, _0)).sharded(shards=8,
+                            ordered=False, executor=executor) >> \
+                    composer(operator.add, _0, 1)
+            self.assertIsInstance(func, ComposerIterableShardedBind)
+            self.assertEqual(sorted(func()),
+                    sorted([ 1 - x for x in range(100) ]))
+
+    def test_protocol(self):
+        _0 = composer(0)
+        shards = []
+
+        class Lines(object):
+
+            def __init__(self, lines):
+                self.lines = lines
+
+            def __iter__(self):
+                return iter(self.lines)
+
+            def composer_shards(self, count):
+                shards.append(count)
+                return [ self.lines[:2], self.lines[2:] ]
+
+        with ThreadPoolExecutor(2) as executor:
+            func = (composer(Lines([ 'a', 'b', 'c' ])) >> \
+                    composer(str.upper, _0)).sharded(workers=3,
+                            executor=executor)
+            self.assertEqual(list(func()), [ 'A', 'B', 'C' ])
+        self.assertEqual(shards, [ 3 ])
+
+    def test_fallback(self):
+        _0 = composer(0)
+        submits = []
+
+        class Executor(ThreadPoolExecutor):
+
+            def submit(self, *args, **kwargs):
+                submits.append(None)
+                return ThreadPoolExecutor.submit(self, *args, **kwargs)
+
+        def count(n):
+            for x in range(n):
+                yield x
+
+        def pairs(it):
+            it = iter(it)
+            for x in it:
+                yield x + next(it)
+
+        with Executor(2) as executor:
+            # a generator cannot be split
+            func = (ComposerIterableFunction(count, _0) >> \
+                    composer(operator.neg, _0)).sharded(executor=executor)
+            self.assertEqual(list(func(3)), [ 0, -1, -2 ])
+            # nor can a stage which is not per item
+            func = (composer([ 1, 2, 3, 4 ]) >> \
+                    ComposerIterableFunction(pairs, _0)).sharded(
+                            executor=executor)
+            self.assertEqual(list(func()), [ 3, 7 ])
+            self.assertEqual(submits, [])
+            # while a range is
+            func = (ComposerIterableFunction(range, _0) >> \
+                    composer(operator.neg, _0)).sharded(executor=executor)
+            self.assertEqual(list(func(3)), [ 0, -1, -2 ])
+        self.assertTrue(len(submits) > 0)
+
+
+class ComposerPickleTest(unittest.TestCase):
+
+    def setUp(self):
+        _0 = composer(0)
+        _1 = composer(1)
+        self.funcs = [
+            composer(operator.add, _0, composer('add_val')) >> \
+                composer(operator.sub, _0, composer('sub_val')),
+            (composer(operator.add, _0, _1) | \
+                composer(operator.sub, _0, _1)) >> \
+                (composer(operator.mul, _0, _1) | 20) >> \
+                composer(operator.add, _0, _1),
+            composer(operator.add)(1) >> composer(operator.sub)(100),
+            composer(range(3)) >> composer(operator.add, _0, \
+                composer('add_val')),
+            composer(operator.add, _0, composer(operator.mul, _0, 2)).cached(),
+        ]
+
+    def test_roundtrip(self):
+        for func in self.funcs:
+            copy = loads_composer(dumps_composer(func))
+            self.assertEqual(copy.argset, func.argset)
+            self.assertEqual(copy.kwargset, func.kwargset)
+            args = (10, 5)[:len(func.argset) or 1]
+            kwargs = dict([ (key, 1) for key in func.kwargset ])
+            result = copy(*args, **kwargs)
+            expected = func(*args, **kwargs)
+            if hasattr(expected, '__next__'):
+                result, expected = list(result), list(expected)
+            self.assertEqual(result, expected)
+
+    def test_partial(self):
+        func = self.funcs[0](add_val=3, sub_val=10)
+        self.assertEqual(loads_composer(dumps_composer(func))(20), 13)
+        self.assertEqual(pickle.loads(pickle.dumps(~func))(20), 13)
+
+        func = self.funcs[0].cached()
+        func(add_val=3, sub_val=10)
+        copy = loads_composer(dumps_composer(func))
+        self.assertEqual(copy.cache_info().currsize, 0)
+        self.assertEqual(copy(add_val=3, sub_val=10)(20), 13)
+
+    def test_process(self):
+        with ProcessPoolExecutor(1) as executor:
+            for func in self.funcs[:3] + self.funcs[4:]:
+                args = (10, 5)[:len(func.argset) or 1]
+                kwargs = dict([ (key, 1) for key in func.kwargset ])
+                self.assertEqual(executor.submit(~func, *args, \
+                        **kwargs).result(), func(*args, **kwargs))
+
+    def test_lambda(self):
+        func = composer(lambda x: x, composer(0))
+        with self.assertRaises((pickle.PicklingError, AttributeError)):
+            dumps_composer(func)
+
+
+class ComposerCSETest(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+        @pure
+        def square(x):
+            self.calls.append(x)
+            return x * x
+
+        def impure(x):
+            self.calls.append(x)
+            return x * x
+
+        self.square = square
+        self.impure = impure
+
+    def test_shared(self):
+        _0 = composer(0)
+        _1 = composer(1)
+        func = (composer(operator.add, composer(self.square, _0), _1) | \
+                composer(operator.sub, composer(self.square, _0), _1)) >> \
+                composer(operator.mul, composer(self.square, _0), _1)
+        compiled = func.compile()
+        self.assertEqual(compiled(3, 1), func(3, 1))
+        del self.calls[:]
+        self.assertEqual(compiled(3, 1), 800)
+        self.assertEqual(self.calls, [ 3, 10 ])
+        del self.calls[:]
+        self.assertEqual(compiled(2, 1), 75)
+        self.assertEqual(self.calls, [ 2, 5 ])
+
+    def test_scope(self):
+        _0 = composer(0)
+        square = composer(self.square, _0)
+        func = composer(operator.add, square, square) >> \
+                composer(operator.add, square, square)
+        self.assertEqual(func.compile()(2), 128)
+        self.assertEqual(self.calls, [ 2, 8 ])
+
+    def test_impure(self):
+        _0 = composer(0)
+        func = composer(operator.add, composer(self.impure, _0), \
+                composer(self.impure, _0))
+        self.assertEqual(func.compile()(3), 18)
+        self.assertEqual(self.calls, [ 3, 3 ])
+
+    def test_registry(self):
+        self.assertTrue(is_pure(operator.add))
+        self.assertTrue(is_pure(self.square))
+        self.assertFalse(is_pure(self.impure))
+        self.assertFalse(is_pure([]))
+
+
+class ComposerFoldTest(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+        @pure
+        def square(x):
+            self.calls.append(x)
+            return x * x
+
+        def impure(x):
+            self.calls.append(x)
+            return x * x
+
+        self.square = square
+        self.impure = impure
+
+    def test_fold_args(self):
+        func = composer(operator.add, composer(self.square, 3), composer(0))
+        self.assertEqual(self.calls, [ 3 ])
+        self.assertEqual(func(1), 10)
+        self.assertEqual(func(2), 11)
+        self.assertEqual(func.compile()(3), 12)
+        self.assertEqual(self.calls, [ 3 ])
+
+    def test_no_fold_impure(self):
+        func = composer(operator.add, composer(self.impure, 3), composer(0))
+        self.assertEqual(self.calls, [])
+        self.assertEqual(func(1), 10)
+        self.assertEqual(func(2), 11)
+        self.assertEqual(self.calls, [ 3, 3 ])
+
+    def test_no_fold_placeholder(self):
+        func = composer(operator.add, composer(self.square, composer(0)), 1)
+        self.assertEqual(func(3), 10)
+        self.assertEqual(func(4), 17)
+        self.assertEqual(self.calls, [ 3, 4 ])
+
+    def test_fold_operators(self):
+        func = composer(self.square, 2) | \
+                composer(operator.neg, composer(0))
+        self.assertEqual(self.calls, [ 2 ])
+        self.assertEqual(func(5), (4, -5))
+        func = composer(self.square, 3) >> composer(operator.neg)
+        self.assertEqual(func(), -9)
+        self.assertEqual(func(), -9)
+        self.assertEqual(self.calls, [ 2, 3 ])
+
+    def test_root_not_folded(self):
+        func = composer(self.square, 2)
+        self.assertEqual(self.calls, [])
+        self.assertEqual(func(), 4)
+        self.assertEqual((~func)(), 4)
+
+    def test_memo(self):
+        calls = []
+
+        @pure(memo=2)
+        def cube(x):
+            calls.append(x)
+            return x ** 3
+
+        self.assertTrue(is_pure(cube))
+        func = composer(operator.add, composer(cube, composer(0)), 1)
+        self.assertEqual([ func(x) for x in [ 1, 2, 1, 2, 3, 1 ] ],
+                [ 2, 9, 2, 9, 28, 2 ])
+        self.assertEqual(calls, [ 1, 2, 3, 1 ])
+        self.assertEqual(cube.cache_info().hits, 2)
+
+    def test_memo_unhashable(self):
+
+        @pure(memo=4)
+        def total(values):
+            return sum(values)
+
+        self.assertEqual(total([ 1, 2 ]), 3)
+        self.assertEqual(total((1, 2)), 3)
+        self.assertEqual(total.cache_info().currsize, 1)
+
+    def test_no_fold_mutable(self):
+        values = [ 1, 2 ]
+        func = composer(operator.add, composer(len, values), composer(0))
+        values.append(3)
+        self.assertEqual(func(0), 3)
+        table = { 'a': 1 }
+        func = composer(operator.add,
+                composer(operator.getitem, table, 'a'), composer(0))
+        table['a'] = 2
+        self.assertEqual(func(0), 2)
+
+    def test_no_fold_error(self):
+        func = composer(operator.add, composer(operator.truediv, 1, 0),
+                composer(0))
+        self.assertRaises(ZeroDivisionError, func, 1)
+        func = composer(operator.truediv, 1, 0) >> composer(operator.neg)
+        self.assertRaises(ZeroDivisionError, func)
+
+    def test_fold_tuple(self):
+        func = composer(operator.add, composer(len, (1, (2, 'a'))),
+                composer(0))
+        self.assertTrue(isinstance(func.args[0], int))
+        self.assertEqual(func(1), 3)
+
+
+class ComposerSlotsTest(unittest.TestCase):
+
+    def test_no_dict(self):
+        _0 = composer(0)
+        nodes = [ _0, composer('a'), ComposerValue(1),
+                composer(operator.add, _0, 1), composer(operator.add),
+                composer(operator.neg, _0) >> composer(operator.neg, _0),
+                composer(operator.neg, _0) | composer(operator.abs, _0),
+                composer([ 1, 2 ]), composer([ 1, 2 ]) >> composer(str, _0),
+                composer(operator.neg, _0).cached() ]
+        for node in nodes:
+            self.assertFalse(hasattr(node, '__dict__'), node)
+
+    def test_iterable(self):
+        it = composer([ 1, 2 ])
+        self.assertEqual(it.getArgSet(), ())
+        self.assertEqual(list((it >> composer(str, composer(0)))()),
+                [ '1', '2' ])
+
+
+class ComposerDeepTest(unittest.TestCase):
+
+    def setUp(self):
+        _0 = composer(0)
+        add1 = composer(operator.add, _0, 1)
+        func = add1
+        for _ in range(4999):
+            func = func >> add1
+        self.func = func
+        self.add1 = add1
+
+    def test_call(self):
+        self.assertEqual(self.func(0), 5000)
+        self.assertEqual(self.func(10), 5010)
+
+    def test_apply_run(self):
+        self.assertEqual(self.func.apply(3).run(), 5003)
+        func = self.func >> composer(operator.mul, composer(0),
+                composer('k'))
+        partial = func(1)
+        self.assertEqual(partial.getKwargSet(), ('k', ))
+        self.assertEqual(partial(k=2), 10002)
+
+    def test_or(self):
+        func = self.add1
+        for _ in range(3000):
+            func = func | self.add1
+        result = func(1)
+        for _ in range(3000):
+            result, last = result
+            self.assertEqual(last, 2)
+        self.assertEqual(result, 2)
+
+    def test_compile(self):
+        self.assertEqual(self.func.compile()(1), 5001)
+
+    def test_fallback(self):
+        # a short result leaves the rest of the chain partially applied
+        func = composer(operator.neg, composer(0)) >> \
+                composer(operator.add, composer(0), composer(1))
+        self.assertEqual(func(1)(2), 1)
+        self.assertEqual(func(1, 2)(5), 4)
+
+    def test_nested_partial(self):
+        # a short result inside a function argument leaves the function
+        # partially applied, as apply() does
+        _1 = composer(1)
+        _2 = composer(2)
+        t1 = lambda a: ('u', a)
+        t2 = lambda a, b: (a, b)
+        func = composer(t1, composer(t2, _1, _1) >> composer(t1, _2))
+        partial = func(2, 0)
+        self.assertIsInstance(partial, ComposerFunction)
+        self.assertEqual(partial(2, 9), ('u', ('u', 2)))
+        func = composer(t1, composer(t2, _1, _1) >> composer(t1, _2)) | \
+                composer(t1, _1)
+        self.assertEqual(func(2, 0)(2, 9), (('u', ('u', 2)), ('u', 0)))
+        func = composer(t1, composer(t2, _1, _1) >> composer(t1, _2)) >> \
+                composer(t1, composer(0))
+        self.assertEqual(func(2, 0)(2, 9), ('u', 'u'))
+
+
+class ComposerProfilerTest(unittest.TestCase):
+
+    def test_report(self):
+        _0 = composer(0)
+
+        def slow(x):
+            time.sleep(0.01)
+            return x
+
+        func = composer(operator.add, _0, 1) >> composer(slow, _0) >> \
+                composer(operator.mul, _0, 2)
+        with ComposerProfiler() as profiler:
+            self.assertEqual(func(1), 4)
+            self.assertEqual(func.compile()(1), 4)
+        self.assertEqual(func(1), 4)
+
+        stats = dict([ (stat.name, stat) for stat in profiler.report() ])
+        self.assertEqual(profiler.report()[0].name, 'ComposerBind')
+        slow_stat = stats['ComposerFunction(%s)' % slow.__qualname__]
+        self.assertEqual(slow_stat.calls, 2)
+        self.assertTrue(slow_stat.selftime >= 0.02)
+        self.assertEqual(stats['ComposerFunction(add)'].calls, 2)
+        self.assertEqual(stats['ComposerBind'].calls, 4)
+        self.assertTrue(stats['ComposerBind'].selftime < 0.01)
+
+    def test_iterable(self):
+        _0 = composer(0)
+        func = composer(range(5)) >> composer(operator.add, _0, 1)
+        with ComposerProfiler() as profiler:
+            self.assertEqual(list(func()), [ 1, 2, 3, 4, 5 ])
+        stats = dict([ (stat.name, stat) for stat in profiler.report() ])
+        stat = stats['ComposerIterableBind(ComposerFunction(add))']
+        self.assertEqual((stat.calls, stat.items), (1, 5))
+
+    def test_callback(self):
+        calls = []
+        func = composer(operator.add, composer(0), 1)
+        with ComposerProfiler(lambda node, elapsed, selftime: \
+                calls.append(node.func)):
+            func(1)
+        self.assertEqual(calls, [ operator.add ])
+
+    def test_disabled(self):
+        run = ComposerFunction.__dict__['run']
+        with ComposerProfiler():
+            self.assertIsNot(ComposerFunction.__dict__['run'], run)
+        self.assertIs(ComposerFunction.__dict__['run'], run)
+
+    def test_threads(self):
+        run = ComposerFunction.__dict__['run']
+        func = composer(operator.add, composer(0), 1)
+        entered = threading.Event()
+        done = threading.Event()
+        profilers = []
+
+        def other():
+            with ComposerProfiler() as profiler:
+                profilers.append(profiler)
+                entered.set()
+                done.wait()
+                func(1)
+
+        th = threading.Thread(target=other)
+        th.start()
+        entered.wait()
+        with ComposerProfiler() as profiler:
+            self.assertEqual(func(1), 2)
+            self.assertEqual(func(2), 3)
+        # the other profiler keeps run() patched until it exits
+        self.assertIsNot(ComposerFunction.__dict__['run'], run)
+        func(3)
+        done.set()
+        th.join()
+        self.assertIs(ComposerFunction.__dict__['run'], run)
+        self.assertEqual(profiler.report()[0].calls, 2)
+        self.assertEqual(profilers[0].report()[0].calls, 1)
+
+
+class ComposerBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        _0 = composer(0)
+        _1 = composer(1)
+        def calc(a, b):
+            return a + b, a - b
+        self.funcs = [
+            composer(operator.add, _0, composer('add_val')) >> \
+                composer(operator.sub, _0, composer('sub_val')),
+            (composer(operator.add, _0, _1) | \
+                composer(operator.sub, _0, _1)) >> \
+                (composer(operator.mul, _0, _1) | 20) >> \
+                composer(operator.add, _0, _1),
+            composer(calc, _0, _1) >> composer(operator.mul, _0, _1),
+            composer(operator.add, _0, _1) | composer(operator.sub, _0, _1),
+            composer(lambda x: x * 2, _0) >> composer(operator.add)(1),
+        ]
+        self.kwargs = { 'add_val': 3, 'sub_val': 10 }
+
+    def check(self, cols):
+        for func in self.funcs:
+            kwargs = dict([ (key, val) for key, val in self.kwargs.items() \
+                    if key in func.kwargset ])
+            expected = [ func(*row, **kwargs) for row in zip(*cols) ]
+            result = func.map_batch(*cols, **kwargs)
+            self.assertEqual(list(result), expected)
+
+    def test_sequence(self):
+        self.check(([ 1, 2, 3, 4 ], [ 4, 3, 2, 1 ]))
+        self.check(([], []))
+
+    @unittest.skipUnless(numpy, 'numpy is not available')
+    def test_numpy(self):
+        self.check((numpy.arange(10), numpy.arange(10, 0, -1)))
+
+        func = self.funcs[0]
+        result = func.map_batch(numpy.arange(5), **self.kwargs)
+        self.assertTrue(isinstance(result, numpy.ndarray))
+
+    @unittest.skipUnless(numpy, 'numpy is not available')
+    def test_numpy_exact(self):
+        _0 = composer(0)
+        _1 = composer(1)
+        cases = [
+            (composer(operator.mul, _0, _1),
+                (numpy.array([ 0, 2 ** 40 ]), numpy.array([ 1, 2 ** 40 ]))),
+            (composer(operator.add, _0, _1),
+                (numpy.array([ 2 ** 62 ]), numpy.array([ 2 ** 62 ]))),
+            (composer(operator.lshift, _0, 60), (numpy.arange(20), )),
+            (composer(operator.neg, _0),
+                (numpy.array([ -2 ** 63, 0 ]), )),
+            (composer(operator.pow, _0, _1),
+                (numpy.array([ 2, 3 ]), numpy.array([ 100, -1 ]))),
+            (composer(operator.add, _0, _1),
+                (numpy.array([ True, False ]), numpy.array([ True, True ]))),
+            (composer(operator.invert, _0), (numpy.array([ True ]), )),
+            (composer(operator.add, _0, _1), (numpy.array([ 2 ** 63 ],
+                dtype=numpy.uint64), numpy.array([ 1 ]))),
+        ]
+        for func, cols in cases:
+            expected = [ func(*row) for row in zip(*[ col.tolist() \
+                    for col in cols ]) ]
+            self.assertEqual(list(func.map_batch(*cols)), expected)
+
+    @unittest.skipUnless(numpy, 'numpy is not available')
+    def test_numpy_errors(self):
+        _0 = composer(0)
+        _1 = composer(1)
+        for func in [ composer(operator.floordiv, _0, _1),
+                composer(operator.mod, _0, _1),
+                composer(operator.truediv, _0, _1) ]:
+            self.assertRaises(ZeroDivisionError, func.map_batch,
+                    numpy.array([ 1, 2 ]), numpy.array([ 1, 0 ]))
+        func = composer(operator.pow, _0, 2000)
+        self.assertRaises(OverflowError, func.map_batch,
+                numpy.array([ 2.0 ]))
+        # the checks leave the fast path alone where it is exact
+        func = composer(operator.mul, _0, _1)
+        result = func.map_batch(numpy.arange(4), numpy.arange(4))
+        self.assertEqual(result.dtype.kind, 'i')
+        self.assertEqual(list(result), [ 0, 1, 4, 9 ])
+
+    @unittest.skipUnless(numpy, 'numpy is not available')
+    def test_numpy_fallback_exact(self):
+        _0 = composer(0)
+        _1 = composer(1)
+        cases = [
+            (composer(operator.add, _0, _1),
+                ([ -1, 2 ** 62 ], [ 0, 2 ** 62 + 1 ])),
+            (composer(operator.pow, _0, _1),
+                ([ 2.0, -8.0 ], [ 0.5, 1 / 3 ])),
+            (composer(operator.add, _0, _1), ([ 1, 2 ** 70 ], [ 1, 1 ])),
+            (composer(lambda x: 1 if x else 0.5, _0), ([ 0, 1 ], )),
+        ]
+        for func, cols in cases:
+            expected = [ func(*row) for row in zip(*cols) ]
+            result = func.map_batch(*cols)
+            self.assertEqual(list(result), expected)
+            self.assertEqual([ type(val) for val in result.tolist() ],
+                    [ type(val) for val in expected ])
+
+    @unittest.skipUnless(numpy, 'numpy is not available')
+    def test_numpy_result_type(self):
+        _0 = composer(0)
+        _1 = composer(1)
+        for func, cols in [
+                (composer(operator.add, _0, _1), ([ 1, 2 ], [ 3, 4 ])),
+                (composer(operator.add, _0, _1) | \
+                    composer(operator.sub, _0, _1), ([ 1, 2 ], [ 3, 4 ])),
+                (composer(str.upper, _0), ([ 'a', 'b' ], )),
+                (composer(operator.add, _0, _1), ([ 1 ], [ 2 ** 70 ])) ]:
+            result = func.map_batch(*cols)
+            self.assertIsInstance(result, numpy.ndarray)
+            self.assertEqual(result.shape, (len(cols[0]), ))
+        result = (composer(operator.add, _0, _1) | \
+                composer(operator.sub, _0, _1)).map_batch([ 1 ], [ 3 ])
+        self.assertEqual(result[0], (4, -2))
+
+    def test_partial(self):
+        func = composer(operator.sub, composer(0), composer('a'))
+        partials = func.map_batch([ 1, 2 ])
+        self.assertEqual([ partial(a=1) for partial in partials ], [ 0, 1 ])
+
+
 ########################################################################
 # main
 ########################################################################
@@ -2,6 +2,7 @@
 #
 
 import errno
+import select
 import socket
 import threading
 import time
@@ -216,6 +217,304 @@ class TimeoutTest(unittest.TestCase):
         th.join()
 
 
+class TimerQueueTest(unittest.TestCase):
+
+    def test_order(self):
+        selectext = SelectExt()
+        fired = []
+        for timeout in [ 0.03, 0.01, 0.02, 0.01 ]:
+            selectext.set_timer(timeout, \
+                    lambda timeout=timeout: fired.append(timeout))
+        while len(fired) < 4:
+            selectext.wait()
+        self.assertEqual(fired, [ 0.01, 0.01, 0.02, 0.03 ])
+        self.assertEqual(selectext.timers, {})
+
+    def test_blocking(self):
+        selectext = SelectExt()
+        fired = []
+        selectext.set_timer(0.1, lambda: fired.append(None))
+        start = time.time()
+        selectext.wait()
+        self.assertEqual(fired, [ None ])
+        self.assertTrue(time.time() - start >= 0.05)
+
+    def test_unset(self):
+        selectext = SelectExt()
+        fired = []
+        idxs = []
+        idxs.append(selectext.set_timer(0, \
+                lambda: selectext.unset_timer(idxs[1])))
+        idxs.append(selectext.set_timer(0, lambda: fired.append(1)))
+        selectext.unset_timer(selectext.set_timer(0, \
+                lambda: fired.append(2)))
+        time.sleep(0.01)
+        selectext.wait()
+        self.assertEqual(fired, [])
+        self.assertEqual(selectext.timers, {})
+
+    def test_compact(self):
+        selectext = SelectExt()
+        idxs = [ selectext.set_timer(10 + i, lambda: 0) for i in range(200) ]
+        for idx in idxs[:150]:
+            selectext.unset_timer(idx)
+        self.assertTrue(len(selectext.timer_heap) < 200)
+        self.assertEqual(len(selectext.timers), 50)
+
+    def test_wakeups(self):
+        selectext = SelectExt()
+        # no loop is waiting, so nothing needs to wake it
+        for i in range(1000):
+            selectext.unset_timer(selectext.set_timer(10 + i, lambda: 0))
+        self.assertFalse(selectext.woken)
+        self.assertEqual(select.select([ selectext.wakeup ], [], [], 0)[0],
+                [])
+
+
+class IntervalTest(unittest.TestCase):
+
+    def test_fixed_rate(self):
+        selectext = SelectExt()
+        ticks = []
+
+        def tick():
+            ticks.append(monotonic())
+            time.sleep(0.01) # does not push the next tick back
+
+        start = monotonic()
+        idx = selectext.set_interval(0.05, tick)
+        while len(ticks) < 6:
+            selectext.wait()
+        selectext.unset_timer(idx)
+        self.assertEqual(selectext.timers, {})
+        for count, tick in enumerate(ticks):
+            self.assertTrue(abs(tick - start - 0.05 * (count + 1)) < 0.03)
+
+    def test_overdue(self):
+        for coalesce, expected in [ (False, 5), (True, 1) ]:
+            selectext = SelectExt()
+            ticks = []
+            done = []
+            selectext.set_interval(0.04, lambda: ticks.append(None),
+                    coalesce)
+            selectext.set_timer(0.215, lambda: done.append(None))
+            # the loop is busy past five ticks, the sixth is due at 0.24
+            time.sleep(0.205)
+            while not done:
+                selectext.wait()
+            self.assertEqual(len(ticks), expected)
+
+    def test_unset_in_callback(self):
+        selectext = SelectExt()
+        ticks = []
+
+        def tick():
+            ticks.append(None)
+            if len(ticks) == 2:
+                selectext.unset_timer(idx)
+
+        idx = selectext.set_interval(0.01, tick)
+        start = monotonic()
+        while monotonic() - start < 0.1:
+            selectext.set_timer(0.01, lambda: 0)
+            selectext.wait()
+        self.assertEqual(len(ticks), 2)
+
+    def test_invalid(self):
+        selectext = SelectExt()
+        self.assertRaises(ValueError, selectext.set_interval, 0, lambda: 0)
+
+
+class RegistrationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.selectext = SelectExt()
+        self.running = True
+
+        def loop():
+            while self.running and self.selectext.wait():
+                pass
+
+        # a far timer keeps the loop in a long select
+        self.selectext.set_timer(60, lambda: 0)
+        self.th = threading.Thread(target=loop, name="select loop")
+        self.th.start()
+        time.sleep(0.05)
+
+    def tearDown(self):
+        self.running = False
+        self.selectext.notify()
+        self.th.join()
+
+    def test_reader(self):
+        a, b = socketpair()
+        event = threading.Event()
+        start = time.time()
+        self.selectext.set_reader(a, lambda: a.recv(16) and event.set())
+        self.assertTrue(time.time() - start < 0.05)
+        b.send(bytes(b'@'))
+        self.assertTrue(event.wait(5))
+        start = time.time()
+        self.selectext.unset_reader(a)
+        self.assertTrue(time.time() - start < 0.05)
+        a.close()
+        b.close()
+
+    def test_timer(self):
+        event = threading.Event()
+        start = time.time()
+        self.selectext.set_timer(0.1, event.set)
+        self.assertTrue(time.time() - start < 0.05)
+        self.assertTrue(event.wait(5))
+        self.assertTrue(abs(time.time() - start - 0.1) < 0.05)
+
+        event.clear()
+        idx = self.selectext.set_timer(0.1, event.set)
+        self.selectext.unset_timer(idx)
+        self.assertFalse(event.wait(0.2))
+
+
+class WakeupTest(unittest.TestCase):
+
+    def readable(self, wakeup):
+        return select.select([ wakeup ], [], [], 0)[0] == [ wakeup ]
+
+    def test_wakeup(self):
+        wakeup = Wakeup()
+        self.assertFalse(self.readable(wakeup))
+        for _ in range(10000):
+            wakeup.send()
+        self.assertTrue(self.readable(wakeup))
+        wakeup.drain()
+        self.assertFalse(self.readable(wakeup))
+        wakeup.drain()
+        wakeup.close()
+
+    @unittest.skipUnless(hasattr(os, 'eventfd'), 'no eventfd')
+    def test_eventfd(self):
+        self.assertEqual(SelectExt().wakeup.pair, None)
+
+    def test_coalesce(self):
+        selectext = SelectExt()
+        writes = []
+        send = selectext.wakeup.send
+        selectext.wakeup.send = lambda: writes.append(None) or send()
+        started = threading.Event()
+
+        def loop():
+            selectext.set_timer(0, started.set)
+            while selectext.wait():
+                pass
+
+        th = threading.Thread(target=loop, name="select loop")
+        th.start()
+        started.wait()
+        time.sleep(0.05)
+        with selectext.rlock:
+            # the loop cannot apply them yet, so one wakeup serves all
+            for i in range(100):
+                selectext.set_timer(10 + i, lambda: 0)
+        selectext.notify()
+        th.join()
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(len(selectext.timers), 100)
+        self.assertFalse(selectext.woken)
+        self.assertFalse(self.readable(selectext.wakeup))
+
+    def test_notify_from_loop(self):
+        selectext = SelectExt()
+        writes = []
+        selectext.wakeup.send = lambda: writes.append(None)
+        selectext.set_timer(0, selectext.notify)
+        count = 0
+        while selectext.wait():
+            count += 1
+        self.assertEqual(writes, [])
+        self.assertTrue(count < 2)
+        # the next loop runs again
+        selectext.set_timer(0, lambda: 0)
+        self.assertTrue(selectext.wait())
+
+
+class BackendTest(unittest.TestCase):
+
+    def echo(self, backend):
+        ssock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        csock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        ssock.bind(("127.0.0.1", 0))
+        csock.bind(("127.0.0.1", 0))
+        received = []
+
+        selectext = SelectExt(backend)
+        selectext.set_reader(csock, lambda: received.append(csock.recv(2048)))
+        selectext.set_reader(ssock, \
+                lambda: ssock.sendto(*ssock.recvfrom(2048)))
+
+        csock.sendto(bytes(b"Hello, world"), ssock.getsockname())
+        while not received:
+            selectext.wait()
+        self.assertEqual(received, [ bytes(b"Hello, world") ])
+        ssock.close()
+        csock.close()
+
+    def test_select(self):
+        self.echo(SelectBackend())
+
+    @unittest.skipUnless(hasattr(select, 'epoll'), 'no epoll')
+    def test_epoll(self):
+        self.echo(EpollBackend())
+
+    def test_interest(self):
+        selectext = SelectExt(SelectBackend())
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        selectext.set_reader(sock, lambda: 0)
+        selectext.set_writer(sock, lambda: 0)
+        self.assertEqual(selectext.backend.events[sock],
+                EVENT_READ | EVENT_WRITE)
+        selectext.unset_reader(sock)
+        self.assertEqual(selectext.backend.events[sock], EVENT_WRITE)
+        selectext.unset_writer(sock)
+        self.assertFalse(sock in selectext.backend.events)
+        sock.close()
+
+    @unittest.skipUnless(hasattr(select, 'epoll'), 'no epoll')
+    def test_hangup(self):
+        selectext = SelectExt(EpollBackend())
+        a, b = socketpair()
+        received = []
+        selectext.set_reader(a, lambda: received.append(a.recv(16)))
+        b.close()
+        selectext.wait()
+        self.assertEqual(received, [ bytes(b"") ])
+        selectext.unset_reader(a)
+        a.close()
+
+    @unittest.skipUnless(hasattr(select, 'epoll'), 'no epoll')
+    def test_fd_setsize(self):
+        try:
+            import resource
+            if resource.getrlimit(resource.RLIMIT_NOFILE)[0] < 1200:
+                self.skipTest('too few file descriptors')
+        except ImportError:
+            pass
+
+        socks = []
+        try:
+            while not socks or socks[-1].fileno() <= 1100:
+                socks.append(socket.socket(socket.AF_INET, socket.SOCK_DGRAM))
+            sock = socks[-1]
+            sock.bind(("127.0.0.1", 0))
+            received = []
+            selectext = SelectExt()
+            selectext.set_reader(sock, lambda: received.append(sock.recv(16)))
+            socks[0].sendto(bytes(b"@"), sock.getsockname())
+            selectext.wait()
+            self.assertEqual(received, [ bytes(b"@") ])
+        finally:
+            for sock in socks:
+                sock.close()
+
+
 ########################################################################
 # main
 ########################################################################